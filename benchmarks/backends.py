@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+"""
+Compares the Decimal and integer amount backends on same-currency
+arithmetic, in microseconds per operation.
+
+    python benchmarks/backends.py
+"""
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import timeit
+
+SETUP = """
+from decimal import Decimal
+from money import Money, IntegerMoney
+a, b = %(cls)s(Decimal('1234.56'), 'USD'), %(cls)s(Decimal('78.90'), 'USD')
+"""
+
+CASES = [
+    ('add', 'a + b'),
+    ('sub', 'a - b'),
+    ('lt', 'a < b'),
+    ('eq', 'a == b'),
+    ('neg', '-a'),
+]
+
+def measure(stmt, cls, number=100000, repeat=5):
+    timer = timeit.Timer(stmt, SETUP % {'cls': cls})
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+def main():
+    print('%-6s %10s %10s %8s' % ('op', 'decimal', 'integer', 'speedup'))
+    for name, stmt in CASES:
+        decimal = measure(stmt, 'Money')
+        integer = measure(stmt, 'IntegerMoney')
+        print('%-6s %10.3f %10.3f %7.2fx' % (name, decimal, integer, decimal / integer))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""
+Measures how long ``import money`` takes in a fresh interpreter, in
+milliseconds, and optionally fails when it exceeds a budget.  The time of
+the package's own modules is reported separately from the standard library
+modules it pulls in (decimal alone is several milliseconds on Python 2),
+and it is the former that --max applies to.
+
+    python benchmarks/importtime.py [--max MILLISECONDS] [--verbose]
+
+With --verbose, and on Pythons that support ``-X importtime`` (3.7+), the
+per-module breakdown of the slowest run is printed as well.
+"""
+import os, sys
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+import subprocess
+from optparse import OptionParser
+
+STATEMENT = "import time; t = time.time(); import money; print((time.time() - t) * 1000)"
+STDLIB = "import bisect, csv, datetime, decimal, heapq, re; "
+
+def run(args=(), statement=STATEMENT):
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='')
+    process = subprocess.Popen([sys.executable] + list(args) + ['-c', statement], env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = process.communicate()
+    if process.returncode:
+        raise SystemExit(err)
+    return float(out), err
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--max', type='float', help='fail if the import takes longer (ms)')
+    parser.add_option('--repeat', type='int', default=20)
+    parser.add_option('--verbose', action='store_true')
+    options, args = parser.parse_args()
+
+    run()  # compile the modules once
+    total = min(run()[0] for i in range(options.repeat))
+    best = min(run(statement=STDLIB + STATEMENT)[0] for i in range(options.repeat))
+    print('import money: %.2f ms, of which money itself: %.2f ms (best of %d)'
+          % (total, best, options.repeat))
+    if options.verbose and sys.version_info >= (3, 7):
+        print(run(['-X', 'importtime'])[1].decode('utf-8'))
+    if options.max is not None and best > options.max:
+        print('slower than the %.2f ms budget' % options.max)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Reports the memory footprint, in bytes per instance, of Money values.
+
+The "dict layout" figures are for classes equivalent to the pre-__slots__
+Money and Currency, which carried a per-instance __dict__.
+
+    python benchmarks/memory.py
+"""
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from decimal import Decimal
+from money import Money, Currency
+
+class DictLayoutCurrency(object):
+    def __init__(self, code, numeric, name, countries):
+        self.code = code
+        self.numeric = numeric
+        self.name = name
+        self.countries = countries
+        self.exchange_rate = None
+
+class DictLayoutMoney(object):
+    def __init__(self, amount, currency):
+        self.amount = amount
+        self.currency = currency
+        self.allow_conversion = False
+
+def instance_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+def main():
+    amount = Decimal('10.00')
+    rows = [
+        ('Currency', instance_size(DictLayoutCurrency('USD', '840', 'US Dollar', [])),
+                     instance_size(Currency('USD', '840', 'US Dollar', []))),
+        ('Money', instance_size(DictLayoutMoney(amount, None)),
+                  instance_size(Money(amount, 'USD'))),
+    ]
+    print('%-10s %12s %12s' % ('type', 'dict layout', 'slots'))
+    for name, before, after in rows:
+        print('%-10s %12d %12d' % (name, before, after))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks of the core Money operations, at several data sizes.
+
+Every case runs one operation over a list of ``size`` prepared values and
+reports the best time per value, in microseconds.  Results are printed as
+a table, and as JSON with --json or --output, so that a run can be saved
+and later ones compared against it:
+
+    python benchmarks/run.py --output baseline.json
+    python benchmarks/run.py --compare baseline.json [--tolerance 0.2]
+
+With --compare the exit status is 1 when any case is slower than the
+baseline by more than the tolerance (20% by default).
+"""
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import json
+import platform
+import time
+import timeit
+from optparse import OptionParser
+
+SETUP = """
+from decimal import Decimal
+from money import Money, currency_provider, sorted_money
+provider = currency_provider()
+usd, eur = provider['USD'], provider['EUR']
+usd.exchange_rate, eur.exchange_rate = Decimal('1.25'), Decimal('0.8')
+size = %(size)d
+amounts = [Decimal(i %% 100000) / 100 for i in range(1, size + 1)]
+strings = ['USD %%s' %% amount for amount in amounts]
+moneys = [Money(amount, usd) for amount in amounts]
+others = [Money(amount, usd) for amount in reversed(amounts)]
+pairs = zip(moneys, others)
+cent = Decimal('0.01')
+ratios = [1, 1, 1]
+"""
+
+# name -> statement run once per value
+CASES = [
+    ('construct_code', "for a in amounts: Money(a, 'USD')"),
+    ('construct_currency', "for a in amounts: Money(a, usd)"),
+    ('construct_default', "for a in amounts: Money(a)"),
+    ('add', "for a, b in pairs: a + b"),
+    ('sub', "for a, b in pairs: a - b"),
+    ('mul', "for a in moneys: a * 3"),
+    ('div', "for a in moneys: a / 3"),
+    ('lt', "for a, b in pairs: a < b"),
+    ('eq', "for a, b in pairs: a == b"),
+    ('sort', "sorted(moneys)"),
+    ('sorted_money', "sorted_money(moneys)"),
+    ('allocate', "for a in moneys: a.allocate(ratios)"),
+    ('from_string', "for s in strings: Money.from_string(s)"),
+    ('convert_to', "for a in moneys: a.convert_to(eur)"),
+    ('convert_to_default', "for a in moneys: a.convert_to_default()"),
+    ('quantize', "for a in moneys: a.quantize(cent)"),
+]
+
+SIZES = (1, 100, 10000)
+
+def measure(stmt, size, repeat=3, min_time=0.2):
+    """
+    The best time per value of ``stmt`` over ``size`` values, in
+    microseconds.
+    """
+    timer = timeit.Timer(stmt, SETUP % {'size': size})
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time / 10 or number >= 1000000:
+            break
+        number *= 10
+    best = min(timer.repeat(repeat, number))
+    return best / number / size * 1e6
+
+def run(cases, sizes, repeat):
+    results = {}
+    for name, stmt in cases:
+        for size in sizes:
+            results['%s/%d' % (name, size)] = measure(stmt, size, repeat)
+    return results
+
+def compare(results, baseline, tolerance):
+    """
+    Prints the change of every case against the baseline and returns the
+    names of those that regressed by more than ``tolerance``.
+    """
+    regressions = []
+    print('%-28s %12s %12s %8s' % ('case', 'baseline', 'now', 'change'))
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        before, after = baseline[key], results[key]
+        change = after / before - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print('%-28s %12.3f %12.3f %+7.1f%%%s' % (key, before, after, change * 100, flag))
+    return regressions
+
+def main():
+    parser = OptionParser()
+    parser.add_option('--case', action='append', help='run only these cases')
+    parser.add_option('--sizes', default=','.join(map(str, SIZES)),
+                      help='comma separated data sizes (default %default)')
+    parser.add_option('--repeat', type='int', default=3)
+    parser.add_option('--json', action='store_true', help='print the results as JSON')
+    parser.add_option('--output', help='save the results as JSON to this file')
+    parser.add_option('--compare', help='compare against results saved with --output')
+    parser.add_option('--tolerance', type='float', default=0.2,
+                      help='allowed slowdown against the baseline (default %default)')
+    options, args = parser.parse_args()
+
+    cases = [case for case in CASES if not options.case or case[0] in options.case]
+    sizes = [int(size) for size in options.sizes.split(',')]
+    results = run(cases, sizes, options.repeat)
+    document = {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'unit': 'us per value',
+        'results': results,
+    }
+
+    if options.json:
+        print(json.dumps(document, indent=2, sort_keys=True))
+    elif not options.compare:
+        print('%-28s %12s' % ('case', 'us/value'))
+        for key in sorted(results):
+            print('%-28s %12.3f' % (key, results[key]))
+    if options.output:
+        with open(options.output, 'w') as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, options.tolerance):
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+"""
+The cost of currency provider scopes per Money construction, in
+microseconds: with no scope open anywhere (the fast path), with a scope
+open in another thread, and inside a scope.
+
+    python benchmarks/scopes.py
+"""
+import os, sys
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import threading
+import timeit
+
+import money
+from money import CurrencyScope
+
+SETUP = """
+from decimal import Decimal
+from money import Money
+amount = Decimal('12.34')
+"""
+
+CASES = [
+    ('default currency', 'Money(amount)'),
+    ('by code', "Money(amount, 'EUR')"),
+]
+
+def measure(stmt, number=100000, repeat=5):
+    timer = timeit.Timer(stmt, SETUP)
+    return min(timer.repeat(repeat, number)) / number * 1e6
+
+def main():
+    provider = money.currency_provider()
+    print('%-18s %10s %14s %12s' % ('construction', 'no scope', 'other thread', 'in scope'))
+    for name, stmt in CASES:
+        unscoped = measure(stmt)
+
+        entered, done = threading.Event(), threading.Event()
+        def hold_scope():
+            with CurrencyScope(provider):
+                entered.set()
+                done.wait()
+        thread = threading.Thread(target=hold_scope)
+        thread.start()
+        entered.wait()
+        elsewhere = measure(stmt)
+        done.set()
+        thread.join()
+
+        with CurrencyScope(provider):
+            scoped = measure(stmt)
+        print('%-18s %10.3f %14.3f %12.3f' % (name, unscoped, elsewhere, scoped))
+
+if __name__ == '__main__':
+    main()
@@ -1,17 +1,171 @@
 # -*- coding: utf-8 -*-
 import exceptions
-from decimal import Decimal
+import heapq
+import threading
+from decimal import Decimal, Context, ROUND_HALF_EVEN
 
 _CURRENCY_PROVIDER = None
+_RATES_VERSION = 0
+_RATES_LOCK = threading.Lock()
+_RATE_TABLES = {}
+
+# providers installed by CurrencyScope, per thread.  _PROVIDER_HOOKS counts
+# the scopes open in all threads, plus one while a provider wrapper is set,
+# so that currency_provider() does no more than return the global provider
+# unless one of them is in use
+_SCOPES = threading.local()
+_PROVIDER_HOOKS = 0
+_PROVIDER_WRAPPER = None
+_WRAPPED_PROVIDERS = {}
+_SCOPES_LOCK = threading.Lock()
+
+# builds the global provider on first use, until then counted in
+# _PROVIDER_HOOKS
+_PROVIDER_LOADER = None
 
 def currency_provider():
+    if _PROVIDER_HOOKS:
+        return _hooked_provider()
     return _CURRENCY_PROVIDER
 
+def _hooked_provider():
+    providers = getattr(_SCOPES, 'providers', None)
+    if providers:
+        provider = providers[-1]
+    elif _PROVIDER_LOADER is not None:
+        provider = _load_provider()
+    else:
+        provider = _CURRENCY_PROVIDER
+    wrapper = _PROVIDER_WRAPPER
+    if wrapper is not None:
+        wrapped = _WRAPPED_PROVIDERS.get(id(provider))
+        if wrapped is None or wrapped.provider is not provider:
+            # wrappers keep their provider alive, so only the last few are
+            # kept, as a new snapshot provider may be used for every request
+            if len(_WRAPPED_PROVIDERS) >= 32:
+                _WRAPPED_PROVIDERS.clear()
+            wrapped = _WRAPPED_PROVIDERS[id(provider)] = wrapper(provider)
+        provider = wrapped
+    return provider
+
+def _set_provider_wrapper(wrapper):
+    """
+    Makes currency_provider() hand out ``wrapper(provider)`` in place of
+    each provider, or stops doing so when ``wrapper`` is None.  Wrappers are
+    made once per provider and must keep it as their ``provider``.
+    """
+    global _PROVIDER_HOOKS, _PROVIDER_WRAPPER
+    with _SCOPES_LOCK:
+        if (_PROVIDER_WRAPPER is None) != (wrapper is None):
+            _PROVIDER_HOOKS += wrapper is None and -1 or 1
+        _PROVIDER_WRAPPER = wrapper
+        _WRAPPED_PROVIDERS.clear()
+
+def _load_provider():
+    global _CURRENCY_PROVIDER, _PROVIDER_LOADER, _PROVIDER_HOOKS
+    with _SCOPES_LOCK:
+        if _PROVIDER_LOADER is not None:
+            _CURRENCY_PROVIDER = _PROVIDER_LOADER()
+            _PROVIDER_LOADER = None
+            _PROVIDER_HOOKS -= 1
+        return _CURRENCY_PROVIDER
+
+def _set_provider_loader(load):
+    """
+    Makes the provider returned by ``load()`` the process wide currency
+    provider.  ``load`` is called once, the first time the provider is
+    needed, so that building it does not slow down ``import money``.
+    """
+    global _PROVIDER_LOADER, _PROVIDER_HOOKS
+    with _SCOPES_LOCK:
+        if _PROVIDER_LOADER is None:
+            _PROVIDER_HOOKS += 1
+        _PROVIDER_LOADER = load
+
 def set_currency_provider(provider):
-    global _CURRENCY_PROVIDER
-    _CURRENCY_PROVIDER = provider
+    """
+    Sets the process wide currency provider, used wherever no CurrencyScope
+    is active.
+    """
+    global _CURRENCY_PROVIDER, _PROVIDER_LOADER, _PROVIDER_HOOKS
+    with _SCOPES_LOCK:
+        if _PROVIDER_LOADER is not None:
+            _PROVIDER_LOADER = None
+            _PROVIDER_HOOKS -= 1
+        _CURRENCY_PROVIDER = provider
+    rates_changed()
+
+class CurrencyScope(object):
+    """
+    Makes ``provider`` the currency provider of the current thread for the
+    duration of a ``with`` block or of calls to a decorated function, so that
+    threads serving different tenants can use different currencies and rates
+    at the same time.  Scopes nest::
+
+        with CurrencyScope(tenant_currencies):
+            price = Money(10)    # in tenant_currencies.get_default()
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def __enter__(self):
+        global _PROVIDER_HOOKS
+        providers = getattr(_SCOPES, 'providers', None)
+        if providers is None:
+            providers = _SCOPES.providers = []
+        providers.append(self.provider)
+        with _SCOPES_LOCK:
+            _PROVIDER_HOOKS += 1
+        return self.provider
+
+    def __exit__(self, *exc_info):
+        global _PROVIDER_HOOKS
+        _SCOPES.providers.pop()
+        with _SCOPES_LOCK:
+            _PROVIDER_HOOKS -= 1
+
+    def __call__(self, function):
+        def scoped(*args, **kwargs):
+            with self:
+                return function(*args, **kwargs)
+        scoped.__name__ = function.__name__
+        scoped.__doc__ = function.__doc__
+        return scoped
+
+def rates_version():
+    return _RATES_VERSION
+
+def rates_changed():
+    """
+    Records that an exchange rate changed, invalidating derived rate tables.
+    Currency does this by itself; other currency implementations must call
+    it when their rates change.
+    """
+    global _RATES_VERSION
+    with _RATES_LOCK:
+        _RATES_VERSION += 1
+
+def rate_table():
+    """
+    Returns the RateTable for the current provider, rebuilding it if rates
+    changed since it was built.  Tables are kept per provider, so threads in
+    different scopes do not keep rebuilding each other's.
+    """
+    provider = currency_provider()
+    table = _RATE_TABLES.get(id(provider))
+    if table is None or table.version != _RATES_VERSION or table.provider is not provider:
+        if len(_RATE_TABLES) >= 32:
+            _RATE_TABLES.clear()
+        table = _RATE_TABLES[id(provider)] = RateTable(provider)
+    return table
 
 class BaseCurrency(object):
+    __slots__ = ()
+
+    # number of digits after the decimal separator in the minor unit
+    exponent = 2
+
     def __repr__(self):
         return self.code
     
@@ -22,34 +176,205 @@ class BaseCurrency(object):
             return self.code == other
         return False #don't know how to compare otherwise
 
+    def __ne__(self, other):
+        return not self == other
+
+def _currency_from_state(code, numeric, name, countries, exchange_rate, exponent=2):
+    """
+    Unpickles a currency, handing back the registered instance when the
+    current provider knows the code so that unpickled values share it.
+    """
+    try:
+        currency = currency_provider()[code]
+    except (KeyError, TypeError, AttributeError):
+        currency = None
+    if type(currency) is Currency:
+        return currency
+    currency = Currency(code, numeric, name, countries, exponent)
+    currency.exchange_rate = exchange_rate
+    return currency
+
 class Currency(BaseCurrency):
-    def __init__(self, code="", numeric="999", name="", countries=[]):
+    __slots__ = ('code', 'numeric', 'name', 'countries', 'exponent', '_exchange_rate')
+
+    def __init__(self, code="", numeric="999", name="", countries=[], exponent=2):
+        if isinstance(code, str):
+            code = intern(code)
         self.code = code
         self.numeric = numeric
         self.name = name
         self.countries = countries
-        self.exchange_rate = None
+        self.exponent = exponent
+        self._exchange_rate = None
+
+    def _get_exchange_rate(self):
+        return self._exchange_rate
+
+    def _set_exchange_rate(self, rate):
+        self._exchange_rate = rate
+        rates_changed()
+
+    exchange_rate = property(_get_exchange_rate, _set_exchange_rate)
+
+    def __reduce__(self):
+        return (_currency_from_state, (self.code, self.numeric, self.name, self.countries,
+                                       self.exchange_rate, self.exponent))
+
+    def __setstate__(self, state):
+        # pickles made before Currency had __slots__ hold its __dict__
+        Currency.__init__(self, state.get('code', ""), state.get('numeric', "999"),
+                          state.get('name', ""), state.get('countries', []),
+                          state.get('exponent', 2))
+        self._exchange_rate = state.get('exchange_rate')
+
+_QUANTIZERS = {}
+
+def _quantizer(exponent, rounding):
+    """
+    Returns the quantum Decimal for ``exponent`` minor unit digits and a
+    Decimal context that rounds with ``rounding``, both cached.
+    """
+    try:
+        return _QUANTIZERS[exponent, rounding]
+    except KeyError:
+        quantizer = _QUANTIZERS[exponent, rounding] = (Decimal(1).scaleb(-exponent), Context(rounding=rounding))
+        return quantizer
+
+class RateTable(object):
+    """
+    The exchange rates of a provider's currencies, so that conversions need
+    no provider lookups.
+
+    A currency's ``exchange_rate`` is its price of one unit of the default
+    currency.  Conversions do the same arithmetic as going through the
+    default currency, dividing by the rate of the source currency and then
+    multiplying by that of the target, so they round the same way.  The
+    table is replaced as a whole once rates_version() moves on.  Only
+    providers that can be enumerated (dicts such as CurrencySource) are
+    tabulated; for others, and for currency objects that are not the
+    provider's own, factors() gives None and conversions fall back to
+    looking up the default currency.  Providers with a true
+    ``rates_by_code`` attribute have their rates used for any currency
+    object with one of their codes.
+
+    ``conversions`` holds the most recent FrozenMoney conversions made at
+    the table's rates, and goes away with the table.
+    """
+
+    def __init__(self, provider):
+        self.version = _RATES_VERSION
+        self.provider = provider
+        self.conversions = _LRUCache(1024)
+        self.default = None
+        self.currencies = {}
+        self.rates = {}
+        self._by_code = getattr(provider, 'rates_by_code', False)
+        if hasattr(provider, 'itervalues'):
+            self.default = provider.get_default()
+            for currency in provider.itervalues():
+                self.currencies[currency.code] = currency
+                if currency.exchange_rate:
+                    self.rates[currency.code] = currency.exchange_rate
+
+    def _known(self, currency):
+        known = self.currencies.get(currency.code)
+        return known is currency or (self._by_code and known is not None)
+
+    def factors(self, source, target):
+        """
+        Returns (divisor, multiplier) such that amounts in ``source`` are
+        converted to ``target`` as ``amount / divisor * multiplier``, where
+        divisor is None when ``source`` is the default currency, or None if
+        the table can't tell.
+        """
+        if not (self._known(source) and self._known(target)):
+            return None
+        multiplier = self.rates.get(target.code)
+        if multiplier is None:
+            return None
+        if self.currencies[source.code] is self.default:
+            return None, multiplier
+        divisor = self.rates.get(source.code)
+        if divisor is None:
+            return None
+        return divisor, multiplier
+
+    def convert(self, amount, source, target):
+        """
+        Converts the Decimal ``amount`` from ``source`` to ``target``, or
+        returns None if the table can't tell.
+        """
+        factors = self.factors(source, target)
+        if factors is None:
+            return None
+        divisor, multiplier = factors
+        if divisor is not None:
+            amount = amount / divisor
+        return amount * multiplier
+
+    def rate_to_default(self, source):
+        """
+        The rate to divide amounts in ``source`` by to get the default
+        currency, or None if the table can't tell or ``source`` is the
+        default currency.
+        """
+        if not self._known(source) or self.currencies[source.code] is self.default:
+            return None
+        return self.rates.get(source.code)
+
+def _resolve_currency(currency):
+    """
+    Returns the currency object for ``currency``: a currency object, a
+    currency code, or None for the default currency.  Codes are looked up
+    as given, then upper-cased if that fails and changes them.
+    """
+    if not currency:
+        return currency_provider().get_default()
+    if isinstance(currency, BaseCurrency):
+        return currency
+    #consider, may result in lots of db queries...
+    provider = currency_provider()
+    try:
+        return provider[currency]
+    except KeyError:
+        code = str(currency).upper()
+        if code == currency:
+            raise
+        return provider[code]
 
 class IncorrectMoneyInputError(exceptions.Exception):
-    def __init__(self):
-        return
+    def __init__(self, value=None):
+        self.value = value
     def __str__(self):
         return "Incorrectly formatted monetary input!"
 
 class Money(object):
+    __slots__ = ('amount', 'currency', 'allow_conversion')
+
     def __init__ (self, amount=Decimal("0.0"), currency=None, allow_conversion=False):
         if not isinstance(amount, Decimal):
             amount = Decimal(amount)
         self.amount = amount
         self.allow_conversion = allow_conversion
-        if not currency:
-            self.currency = currency_provider().get_default()
-        else:
-            if not isinstance(currency, BaseCurrency):
-                currency =currency_provider()[str(currency).upper()] #consider, may result in lots of db queries...
-            self.currency = currency
+        if not isinstance(currency, BaseCurrency):
+            currency = _resolve_currency(currency)
+        self.currency = currency
+    def __reduce__(self):
+        from money.codec import _reduce
+        return _reduce(self) or (self.__class__, (self.amount, self.currency, self.allow_conversion))
+    def __setstate__(self, state):
+        # pickles made before Money had __slots__ hold its __dict__, with a
+        # copy of the currency rather than the registered one
+        currency = state['currency']
+        if type(currency) is Currency:
+            currency = _currency_from_state(currency.code, currency.numeric, currency.name,
+                                            currency.countries, currency.exchange_rate,
+                                            currency.exponent)
+        self.amount = state['amount']
+        self.currency = currency
+        self.allow_conversion = state.get('allow_conversion', False)
     def __repr__(self):
-        return '%s %5.2f' % (self.currency, self.amount)
+        return '%s %5.*f' % (self.currency, self.currency.exponent, self.amount)
     def __abs__(self):
         return Money(amount=abs(self.amount), currency=self.currency)
     def __pos__(self):
@@ -100,14 +425,31 @@ class Money(object):
         else:
             return Money(amount = other * self.amount / 100, currency = self.currency)
     def convert_to_default(self):
+        table = rate_table()
+        if self.currency is table.default:
+            return self.copy()
+        rate = table.rate_to_default(self.currency)
+        if rate is not None:
+            return Money(amount = self.amount / rate, currency = table.default)
         if self.currency == currency_provider().get_default():
             return self.copy()
         assert self.currency.exchange_rate, 'No exchange rate defined for: %s' % self.currency
         return Money(amount = self.amount / self.currency.exchange_rate, currency=currency_provider().get_default())
-    def convert_to(self, currency):
+    def convert_to(self, currency, at=None):
         """
-        Convert from one currency to another.
+        Convert from one currency to another.  Given a date as ``at``, the
+        rates in effect on that date in the rate history are used instead of
+        the current ones.
         """
+        if at is not None:
+            from money.rates import rate_history
+            return rate_history().convert(self, currency, at)
+        amount = rate_table().convert(self.amount, self.currency, currency)
+        if amount is not None:
+            ret = self.copy()
+            ret.currency = currency
+            ret.amount = amount
+            return ret
         assert currency.exchange_rate, 'No exchange rate defined'
         if self.currency == currency_provider().get_default():
             ret = self.copy()
@@ -118,6 +460,30 @@ class Money(object):
         return ret
     def quantize(self, *args, **kwargs):
         return Money(amount = self.amount.quantize(*args, **kwargs), currency=self.currency)
+    def round(self, rounding=ROUND_HALF_EVEN):
+        """
+        Rounds the amount to the minor unit of its currency (cents for USD,
+        whole yen for JPY).
+        """
+        quantum, context = _quantizer(self.currency.exponent, rounding)
+        return self._rounded(quantum, context)
+    @classmethod
+    def round_many(cls, moneys, rounding=ROUND_HALF_EVEN):
+        """
+        Rounds each of ``moneys`` to its currency's minor unit, returning a
+        list.
+        """
+        quantizers = {}
+        results = []
+        for money in moneys:
+            exponent = money.currency.exponent
+            quantizer = quantizers.get(exponent)
+            if quantizer is None:
+                quantizer = quantizers[exponent] = _quantizer(exponent, rounding)
+            results.append(money._rounded(*quantizer))
+        return results
+    def _rounded(self, quantum, context):
+        return Money(amount=self.amount.quantize(quantum, context=context), currency=self.currency)
     def copy(self):
         return Money(amount=self.amount, currency=self.currency)
     def __format__(self, *args, **kwargs):
@@ -162,9 +528,21 @@ class Money(object):
         else:
             return self.amount > other
     def __le__(self, other):
-        return self < other or self == other
+        if isinstance(other, Money):
+            if (self.currency == other.currency):
+                return (self.amount <= other.amount)
+            else:
+                raise TypeError, 'can not compare different currencies'
+        else:
+            return self.amount <= other
     def __ge__(self, other):
-        return self > other or self == other
+        if isinstance(other, Money):
+            if (self.currency == other.currency):
+                return (self.amount >= other.amount)
+            else:
+                raise TypeError, 'can not compare different currencies'
+        else:
+            return self.amount >= other
 
     #
     # Miscellaneous helper methods
@@ -172,20 +550,68 @@ class Money(object):
 
     def allocate(self, ratios):
         """
-        Allocates a sum of money to several accounts.
+        Allocates a sum of money to several accounts, in proportion to
+        ``ratios``.  The sum is split in minor units of its currency using the
+        largest remainder method, so the parts always add up to it exactly.
+        """
+        return self.allocate_many([self], ratios)[0]
+
+    @classmethod
+    def allocate_many(cls, moneys, ratios):
+        """
+        Allocates each of ``moneys`` across the same ``ratios``, returning one
+        list of parts per sum.  Runs in time linear in the number of parts,
+        apart from picking which parts receive the leftover minor units.
         """
-        total = sum(ratios)
-        remainder = self.amount
+        ratios, total = _integer_ratios(ratios)
+        indexes = range(len(ratios))
         results = []
-        for i in range(0, len(ratios)):
-            results.append(Money(amount = self.amount * ratios[i] / total, currency = self.currency))
-            remainder -= results[i].amount
-        i = 0
-        while i < remainder:
-            results[i].amount += Decimal("0.01")
-            i += 1
+        for money in moneys:
+            if isinstance(money, IntegerMoney):
+                units, exponent = money.units, money.exponent
+                if exponent < money.currency.exponent:
+                    units *= 10 ** (money.currency.exponent - exponent)
+                    exponent = money.currency.exponent
+            else:
+                units, exponent = _minor_units(money.amount, money.currency.exponent)
+            shares = _allocate_units(units, ratios, total, indexes)
+            currency = money.currency
+            if isinstance(money, IntegerMoney):
+                results.append([_integer_money(share, exponent, currency) for share in shares])
+            else:
+                results.append([Money(Decimal(share).scaleb(-exponent), currency) for share in shares])
         return results
 
+    @classmethod
+    def sum(cls, moneys, currency=None):
+        """
+        Adds up an iterable of Money in one pass, building a single Money at
+        the end instead of one per element.  All values must be in
+        ``currency``, which defaults to the currency of the first one (or the
+        default currency when there is none).
+        """
+        if currency is not None and not isinstance(currency, BaseCurrency):
+            currency = _resolve_currency(currency)
+        total = Decimal(0)
+        units = 0
+        exponent = 0
+        for money in moneys:
+            if money.currency is not currency:
+                if currency is None:
+                    currency = money.currency
+                elif money.currency != currency:
+                    raise TypeError, 'can not add different currencies'
+            if isinstance(money, IntegerMoney):
+                if money.exponent > exponent:
+                    units *= 10 ** (money.exponent - exponent)
+                    exponent = money.exponent
+                units += money.units * 10 ** (exponent - money.exponent)
+            else:
+                total += money.amount
+        if units or exponent:
+            total += Decimal(units).scaleb(-exponent)
+        return cls(total, currency)
+
     def spell_out(self):
         """
         Spells out a monetary amount.  E.g. "Two-hundred and twenty-six dollars and seventeen cents."
@@ -197,20 +623,320 @@ class Money(object):
         """
         Parses a properly formatted string and extracts the monetary value and currency
         """
-        s = str(s).strip()
-        sign = 1
-        if s.startswith('-'):
-            sign = -1
-            s = s[1:].strip()
+        from money.parsing import DEFAULT_PARSER
+        return DEFAULT_PARSER.parse(s, cls)
+
+class _LRUCache(object):
+    """
+    A mapping of at most ``maxsize`` entries that evicts the least recently
+    used one.  Entries are [previous, next, key, value] links of a circular
+    list, most recent last.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._links = {}
+            self._root = root = []
+            root[:] = [root, root, None, None]
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                return default
+            previous, next, key, value = link
+            previous[1] = next
+            next[0] = previous
+            root = self._root
+            last = root[0]
+            last[1] = root[0] = link
+            link[0] = last
+            link[1] = root
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            links = self._links
+            if key in links:
+                links[key][3] = value
+                return
+            root = self._root
+            if len(links) >= self.maxsize:
+                oldest = root[1]
+                root[1] = oldest[1]
+                oldest[1][0] = root
+                del links[oldest[2]]
+            last = root[0]
+            last[1] = root[0] = links[key] = [last, root, key, value]
+
+    def __len__(self):
+        return len(self._links)
+
+class FrozenMoney(Money):
+    """
+    An immutable Money: every attribute may be assigned exactly once, by the
+    constructor.  Arithmetic still returns plain Money instances.
+
+    FrozenMoney is hashable.  The hash is that of the amount, which keeps it
+    consistent with equality: values in different currencies are never
+    equal, and a FrozenMoney equals a number with the same amount.
+    Conversions are memoized, as the results are immutable too, in the
+    current rate table, which is replaced whenever the rates or the
+    provider change.
+    """
+    __slots__ = ('_hash',)
+
+    def __setattr__(self, name, value):
+        if hasattr(self, name):
+            raise AttributeError, 'FrozenMoney is immutable'
+        super(FrozenMoney, self).__setattr__(name, value)
+
+    def __delattr__(self, name):
+        raise AttributeError, 'FrozenMoney is immutable'
+
+    def __hash__(self):
         try:
-            amount = Decimal(s)
-            currency = currency_provider().get_default()
-        except:
-            try:
-                currency, amount = s.split(' ',1)
-                currency = currency_provider()[currency.strip().upper()]
-                amount = Decimal(amount.strip())
-            except:
-                raise IncorrectMoneyInputError
-        return cls(amount*sign, currency)
+            return self._hash
+        except AttributeError:
+            self._hash = hash(self.amount)
+            return self._hash
+
+    def convert_to(self, currency, at=None):
+        if at is not None:
+            converted = Money.convert_to(self, currency, at)
+            return FrozenMoney(converted.amount, converted.currency)
+        # str() tells apart equal amounts with different exponents, whose
+        # conversions differ in the same way, and is cheaper than hashing a
+        # Decimal
+        conversions = rate_table().conversions
+        key = (str(self.amount), self.currency, currency)
+        converted = conversions.get(key)
+        if converted is None:
+            converted = Money.convert_to(self, currency)
+            converted = FrozenMoney(converted.amount, converted.currency)
+            conversions.put(key, converted)
+        return converted
+
+def _minor_units(amount, exponent):
+    """
+    Splits a Decimal into an integer count of 10**-e units, where e is
+    ``exponent`` or the number of decimal places of ``amount`` if larger.
+    Returns (units, e).
+    """
+    places = amount.as_tuple()[2]
+    if not isinstance(places, (int, long)):
+        raise ValueError, 'can not express %s in minor units' % amount
+    if -places > exponent:
+        exponent = -places
+    return int(amount.scaleb(exponent)), exponent
+
+def _exact_units(amount):
+    """
+    Splits a Decimal into an integer count of 10**-e units, where e is the
+    number of decimal places of ``amount`` (negative for amounts such as
+    1E+3).  Returns (units, e).
+    """
+    places = amount.as_tuple()[2]
+    if not isinstance(places, (int, long)):
+        raise ValueError, 'can not express %s in minor units' % amount
+    return int(amount.scaleb(-places)), -places
+
+def _integer_ratios(ratios):
+    """
+    Scales ``ratios`` to integers with the same proportions.  Returns the
+    integers and their sum.
+    """
+    scaled = []
+    places = 0
+    for ratio in ratios:
+        if not isinstance(ratio, (int, long)):
+            if isinstance(ratio, float):
+                ratio = Decimal(repr(ratio))
+            elif not isinstance(ratio, Decimal):
+                ratio = Decimal(ratio)
+            places = max(places, -ratio.as_tuple()[2])
+        scaled.append(ratio)
+    if places:
+        scaled = [int(Decimal(ratio).scaleb(places)) for ratio in scaled]
+    total = sum(scaled)
+    if total <= 0 or min(scaled) < 0:
+        raise ValueError, 'ratios must be non-negative and add up to more than zero'
+    return scaled, total
+
+def _allocate_units(units, ratios, total, indexes):
+    """
+    Splits an integer number of units in proportion to integer ``ratios``
+    adding up to ``total``, by the largest remainder method.  ``indexes`` is
+    range(len(ratios)).
+    """
+    shares = []
+    remainders = []
+    allocated = 0
+    for ratio in ratios:
+        share, remainder = divmod(units * ratio, total)
+        shares.append(share)
+        remainders.append(remainder)
+        allocated += share
+    leftover = units - allocated
+    if leftover:
+        # nlargest() is stable, so ties go to the earlier parts
+        for i in heapq.nlargest(leftover, indexes, key=remainders.__getitem__):
+            shares[i] += 1
+    return shares
+
+def _integer_money(units, exponent, currency):
+    money = object.__new__(IntegerMoney)
+    money.units = units
+    money.exponent = exponent
+    money.currency = currency
+    money.allow_conversion = False
+    return money
+
+class IntegerMoney(Money):
+    """
+    A Money that holds its amount as an integer count of minor units
+    (``units`` of 10**-``exponent``), so that same-currency addition,
+    subtraction and comparison are integer operations.  The exponent is the
+    number of decimal places the amount has as a Decimal, so ``amount``,
+    still available as a Decimal, is the same as with the Decimal backend,
+    down to str(), except that zero has no sign.
+    """
+    __slots__ = ('units', 'exponent')
+
+    def __init__ (self, amount=Decimal("0.0"), currency=None, allow_conversion=False):
+        if not isinstance(amount, Decimal):
+            amount = Decimal(amount)
+        self.allow_conversion = allow_conversion
+        if not isinstance(currency, BaseCurrency):
+            currency = _resolve_currency(currency)
+        self.currency = currency
+        self.units, self.exponent = _exact_units(amount)
+
+    def _get_amount(self):
+        return Decimal(self.units).scaleb(-self.exponent)
+
+    def _set_amount(self, amount):
+        if not isinstance(amount, Decimal):
+            amount = Decimal(amount)
+        self.units, self.exponent = _exact_units(amount)
+
+    amount = property(_get_amount, _set_amount)
+
+    @classmethod
+    def _from_money(cls, money):
+        if isinstance(money, IntegerMoney):
+            return money
+        return cls(money.amount, money.currency)
+
+    def _aligned(self, other):
+        """
+        Returns the units of self and of ``other`` (an IntegerMoney) at a
+        common exponent, plus that exponent.
+        """
+        exponent = self.exponent
+        if exponent == other.exponent:
+            return self.units, other.units, exponent
+        if exponent > other.exponent:
+            return self.units, other.units * 10 ** (exponent - other.exponent), exponent
+        return self.units * 10 ** (other.exponent - exponent), other.units, other.exponent
+
+    def _same_currency(self, other):
+        return isinstance(other, IntegerMoney) and \
+            (other.currency is self.currency or other.currency == self.currency)
+
+    def __abs__(self):
+        return _integer_money(abs(self.units), self.exponent, self.currency)
+    def __pos__(self):
+        return _integer_money(self.units, self.exponent, self.currency)
+    def __neg__(self):
+        return _integer_money(-self.units, self.exponent, self.currency)
+    def __add__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return _integer_money(mine + theirs, exponent, self.currency)
+        return self._from_money(Money.__add__(self, other))
+    def __sub__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return _integer_money(mine - theirs, exponent, self.currency)
+        return self._from_money(Money.__sub__(self, other))
+    def __mul__(self, other):
+        if isinstance(other, (int, long)):
+            return _integer_money(self.units * other, self.exponent, self.currency)
+        return self._from_money(Money.__mul__(self, other))
+    def __div__(self, other):
+        return self._from_money(Money.__div__(self, other))
+    def __rmod__(self, other):
+        return self._from_money(Money.__rmod__(self, other))
+    def convert_to_default(self):
+        return self._from_money(Money.convert_to_default(self))
+    def quantize(self, *args, **kwargs):
+        return self._from_money(Money.quantize(self, *args, **kwargs))
+    def _rounded(self, quantum, context):
+        if self.exponent == self.currency.exponent:
+            return self.copy()
+        return self._from_money(Money._rounded(self, quantum, context))
+    def copy(self):
+        return _integer_money(self.units, self.exponent, self.currency)
+    def __nonzero__(self):
+        return self.units != 0
+    __radd__ = __add__
+    __rsub__ = __sub__
+    __rmul__ = __mul__
+    __rdiv__ = __div__
+
+    def __eq__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return mine == theirs
+        return Money.__eq__(self, other)
+    def __lt__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return mine < theirs
+        return Money.__lt__(self, other)
+    def __gt__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return mine > theirs
+        return Money.__gt__(self, other)
+    def __le__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return mine <= theirs
+        return Money.__le__(self, other)
+    def __ge__(self, other):
+        if self._same_currency(other):
+            mine, theirs, exponent = self._aligned(other)
+            return mine >= theirs
+        return Money.__ge__(self, other)
+
+def _integer_new(cls, *args, **kwargs):
+    if cls is Money:
+        cls = IntegerMoney
+    return object.__new__(cls)
+
+def amount_backend():
+    if '__new__' in Money.__dict__:
+        return 'integer'
+    return 'decimal'
 
+def set_amount_backend(backend):
+    """
+    Chooses how plain ``Money(...)`` stores amounts: 'decimal' (the
+    default) or 'integer', which makes it construct IntegerMoney instances.
+    Subclasses of Money are not affected.  The hook is only installed while
+    the integer backend is selected, so the default costs nothing.
+    """
+    if backend == 'integer':
+        Money.__new__ = staticmethod(_integer_new)
+    elif backend == 'decimal':
+        if '__new__' in Money.__dict__:
+            del Money.__new__
+    else:
+        raise ValueError, 'unknown amount backend: %r' % backend
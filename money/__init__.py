@@ -1,3 +1,7 @@
 import currencies
 from Money import *
-set_currency_provider(currencies.CURRENCY)
+from Money import _set_provider_loader
+from bag import MoneyBag
+from sorting import sort_key, sorted_money, nlargest_money
+from rates import RateHistory, rate_history, set_rate_history
+_set_provider_loader(currencies.currency_table)
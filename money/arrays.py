@@ -0,0 +1,503 @@
+# -*- coding: utf-8 -*-
+"""
+Columnar monetary amounts backed by NumPy (an optional dependency).
+
+A MoneyArray keeps its amounts either as int64 counts of 10**-exponent
+units, which makes addition, subtraction, integer/Decimal multiplication,
+percentages and comparisons vectorized integer operations, or as an object
+array of Decimals when the values do not fit (e.g. after a division).
+Currencies are kept in a parallel column of currency codes.
+
+Alongside the int64 amounts, a column of decimal places records how many
+places each amount has as a Decimal, and every operation works them out
+the way Decimal arithmetic would.  Converting to and from Money is
+therefore lossless, and the results are those of the same operations on
+Money, down to str():
+
+>>> array = MoneyArray.from_amounts(['3', '1.5', '0.25'], 'USD')
+>>> [str(amount) for amount in (array * 2).decimals()]
+['6', '3.0', '0.50']
+
+Amounts that int64 counts can not hold exactly as Decimals (negative
+zeros, or positive exponents such as ``1E+3``) are kept as Decimals.
+"""
+from __future__ import absolute_import
+
+from decimal import Decimal, getcontext, ROUND_HALF_EVEN, ROUND_HALF_UP, \
+    ROUND_HALF_DOWN, ROUND_FLOOR, ROUND_CEILING, ROUND_DOWN, ROUND_UP
+
+import numpy
+
+from money.Money import Money, currency_provider, rate_table, _integer_ratios
+
+__all__ = ('MoneyArray',)
+
+_INT64_MAX = 2 ** 63 - 1
+
+def _code(currency):
+    if hasattr(currency, 'code'):
+        return currency.code
+    return str(currency).upper()
+
+def _scaled(amount, exponent):
+    return int(amount.scaleb(exponent))
+
+def _int64_exponent(amount):
+    """
+    Number of decimal places of ``amount`` if an int64 array can hold it
+    exactly, with its places recorded alongside, or None.
+    """
+    exponent = amount.as_tuple()[2]
+    if not isinstance(exponent, (int, long)) or exponent > 0:
+        return None
+    if not amount and amount.is_signed():
+        return None
+    return -exponent
+
+def _powers(exponents):
+    """
+    10**``exponents`` as an int64 array.  Exponents over 18 are capped: they
+    only occur for amounts whose count of units is zero.
+    """
+    return 10 ** numpy.minimum(exponents, 18).astype(numpy.int64)
+
+def _negative_zeros(amounts, factor, products):
+    """
+    Whether multiplying ``amounts`` by the Decimal ``factor`` gives any zero
+    that Decimal would make negative.
+    """
+    zeros = products == 0
+    if not zeros.any():
+        return False
+    negative = amounts < 0
+    if factor.is_signed():
+        negative = ~negative
+    return bool((zeros & negative).any())
+
+def _fits(values, factor=1):
+    if not len(values):
+        return True
+    bound = max(abs(int(values.max())), abs(int(values.min())))
+    return bound * abs(factor) <= _INT64_MAX
+
+def _rounded_division(values, divisor, rounding):
+    """
+    Divides int64 ``values`` by the positive integer ``divisor``, rounding
+    the way the Decimal ``rounding`` mode would.
+    """
+    quotient, remainder = numpy.divmod(values, divisor)
+    if rounding == ROUND_FLOOR:
+        return quotient
+    up = remainder > 0
+    if rounding == ROUND_CEILING:
+        return quotient + up
+    negative = values < 0
+    if rounding == ROUND_DOWN:
+        return quotient + (up & negative)
+    if rounding == ROUND_UP:
+        return quotient + (up & ~negative)
+    twice = remainder * 2
+    if rounding == ROUND_HALF_UP:
+        # ties away from zero
+        return quotient + ((twice > divisor) | ((twice == divisor) & ~negative))
+    if rounding == ROUND_HALF_DOWN:
+        # ties towards zero
+        return quotient + ((twice > divisor) | ((twice == divisor) & negative))
+    if rounding == ROUND_HALF_EVEN:
+        return quotient + ((twice > divisor) | ((twice == divisor) & (quotient % 2 == 1)))
+    return None
+
+class MoneyArray(object):
+    """
+    A sequence of Money values stored column-wise.
+
+    ``amounts`` is either an int64 array of amounts scaled by
+    10**``exponent``, or, when ``exponent`` is None, an object array of
+    Decimals.  ``currencies`` holds one currency code per amount, and
+    ``places``, for int64 amounts, the number of decimal places of each
+    (at most ``exponent``); it defaults to ``exponent`` for all of them.
+    """
+
+    def __init__(self, amounts, currencies, exponent=None, places=None):
+        self.amounts = amounts
+        self.currencies = currencies
+        self.exponent = exponent
+        if exponent is not None and places is None:
+            places = numpy.empty(len(amounts), dtype=numpy.int64)
+            places[:] = exponent
+        self.places = places
+
+    @classmethod
+    def from_moneys(cls, moneys, high_precision=False):
+        """
+        Builds an array from an iterable of Money.  The conversion is exact:
+        amounts that the int64 representation can not hold, or any amounts
+        at all when ``high_precision`` is set, are kept as Decimals.
+        """
+        moneys = list(moneys)
+        currencies = numpy.array([_code(m.currency) for m in moneys], dtype=object)
+        decimals = [m.amount for m in moneys]
+        return cls._from_decimals(decimals, currencies, high_precision)
+
+    @classmethod
+    def from_amounts(cls, amounts, currency, high_precision=False):
+        """
+        Builds an array of amounts that all share ``currency``.
+        """
+        decimals = [Decimal(a) for a in amounts]
+        currencies = numpy.empty(len(decimals), dtype=object)
+        currencies[:] = _code(currency)
+        return cls._from_decimals(decimals, currencies, high_precision)
+
+    @classmethod
+    def _from_decimals(cls, decimals, currencies, high_precision=False):
+        if not high_precision:
+            exponents = [_int64_exponent(d) for d in decimals]
+            if None not in exponents:
+                exponent = max(exponents or [0])
+                scaled = [_scaled(d, exponent) for d in decimals]
+                if not scaled or max(abs(min(scaled)), abs(max(scaled))) <= _INT64_MAX:
+                    return cls(numpy.array(scaled, dtype=numpy.int64), currencies, exponent,
+                               numpy.array(exponents, dtype=numpy.int64))
+        amounts = numpy.empty(len(decimals), dtype=object)
+        amounts[:] = decimals
+        return cls(amounts, currencies)
+
+    def to_moneys(self):
+        """
+        Returns the values as a list of Money.
+        """
+        lookup = {}
+        provider = currency_provider()
+        for code in set(self.currencies):
+            lookup[code] = provider[code]
+        return [Money(amount, lookup[code])
+                for amount, code in zip(self.decimals(), self.currencies)]
+
+    def decimals(self):
+        """
+        Returns the amounts as an object array of Decimals.
+        """
+        if self.exponent is None:
+            return self.amounts
+        exponent = self.exponent
+        decimals = numpy.empty(len(self.amounts), dtype=object)
+        decimals[:] = [Decimal(int(v) // 10 ** (exponent - int(p))).scaleb(-int(p))
+                       for v, p in zip(self.amounts, self.places)]
+        return decimals
+
+    def _like(self, amounts, exponent=None, currencies=None, places=None):
+        if currencies is None:
+            currencies = self.currencies
+        return MoneyArray(amounts, currencies, exponent, places)
+
+    def _rescaled(self, exponent):
+        """
+        The int64 amounts expressed in 10**-``exponent`` units, or None if
+        they would overflow.
+        """
+        if exponent == self.exponent:
+            return self.amounts
+        factor = 10 ** (exponent - self.exponent)
+        if not _fits(self.amounts, factor):
+            return None
+        return self.amounts * factor
+
+    def _aligned(self, other):
+        """
+        Returns the amounts of ``self`` and ``other`` (a MoneyArray) in a
+        common representation, plus its exponent.
+        """
+        if self.exponent is not None and other.exponent is not None:
+            exponent = max(self.exponent, other.exponent)
+            mine = self._rescaled(exponent)
+            theirs = other._rescaled(exponent)
+            if mine is not None and theirs is not None:
+                return mine, theirs, exponent
+        return self.decimals(), other.decimals(), None
+
+    def _coerce(self, other):
+        if isinstance(other, Money):
+            return MoneyArray.from_amounts([other.amount] * len(self), other.currency)
+        if isinstance(other, MoneyArray):
+            if len(other) != len(self):
+                raise ValueError, 'arrays must have the same length'
+            return other
+        return None
+
+    #
+    # Sequence protocol
+    #
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def __iter__(self):
+        return iter(self.to_moneys())
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, long, numpy.integer)):
+            amount = self.amounts[index]
+            if self.exponent is not None:
+                places = int(self.places[index])
+                amount = Decimal(int(amount) // 10 ** (self.exponent - places)).scaleb(-places)
+            return Money(amount, self.currencies[index])
+        places = self.places
+        if places is not None:
+            places = places[index]
+        return MoneyArray(self.amounts[index], self.currencies[index], self.exponent, places)
+
+    def __repr__(self):
+        return 'MoneyArray(%r)' % self.to_moneys()
+
+    #
+    # Arithmetic
+    #
+
+    def _additive(self, other, op):
+        theirs = self._coerce(other)
+        if theirs is None:
+            raise TypeError, 'can only add or subtract monetary quantities'
+        if not (self.currencies == theirs.currencies).all():
+            raise TypeError, 'can not add or subtract different currencies'
+        mine, theirs_amounts, exponent = self._aligned(theirs)
+        if exponent is not None and not (_fits(mine, 2) and _fits(theirs_amounts, 2)):
+            mine, theirs_amounts, exponent = self.decimals(), theirs.decimals(), None
+        if exponent is None:
+            return self._like(op(mine, theirs_amounts))
+        # like Decimal, the result has the places of the operand with more
+        return self._like(op(mine, theirs_amounts), exponent,
+                          places=numpy.maximum(self.places, theirs.places))
+
+    def __add__(self, other):
+        return self._additive(other, numpy.add)
+
+    def __sub__(self, other):
+        return self._additive(other, numpy.subtract)
+
+    def __rsub__(self, other):
+        return -self + other
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return self._like(-self.amounts, self.exponent, places=self.places)
+
+    def __pos__(self):
+        return self._like(self.amounts.copy(), self.exponent, places=self.places)
+
+    def __abs__(self):
+        return self._like(numpy.abs(self.amounts), self.exponent, places=self.places)
+
+    def _scaled_by(self, factor, percentage=False):
+        """
+        Multiplies by the number ``factor``, and divides by 100 for a
+        percentage, staying in int64 whenever that is exact.
+        """
+        if isinstance(factor, (int, long)):
+            factor = Decimal(factor)
+        if self.exponent is not None and isinstance(factor, Decimal):
+            exponent = _int64_exponent(factor.copy_abs())
+            if exponent is not None:
+                coefficient = _scaled(factor, exponent)
+                if _fits(self.amounts, coefficient):
+                    products = self.amounts * coefficient
+                    if not _negative_zeros(self.amounts, factor, products):
+                        places = self.places + exponent
+                        exponent += self.exponent
+                        if percentage:
+                            places = self._percentage_places(products, exponent, places)
+                            exponent += 2
+                        return self._like(products, exponent, places=places)
+        amounts = self.decimals() * factor
+        if percentage:
+            amounts = amounts / 100
+        return self._like(amounts)
+
+    @staticmethod
+    def _percentage_places(products, exponent, places):
+        """
+        The places of ``products`` (scaled by 10**``exponent``, with
+        ``places`` places each) divided by 100.  An exact Decimal quotient
+        keeps as few of the two extra places as it can, but no fewer than
+        the dividend had.
+        """
+        units = products // _powers(exponent - places)
+        extra = numpy.where(units % 100 == 0, 0, numpy.where(units % 10 == 0, 1, 2))
+        return places + extra
+
+    def __mul__(self, other):
+        if isinstance(other, (Money, MoneyArray)):
+            raise TypeError, 'can not multiply monetary quantities'
+        return self._scaled_by(other)
+
+    __rmul__ = __mul__
+
+    def __div__(self, other):
+        if isinstance(other, (Money, MoneyArray)):
+            raise TypeError, 'can not divide monetary quantities'
+        return self._like(self.decimals() / other)
+
+    __truediv__ = __div__
+
+    def __rmod__(self, other):
+        """
+        Calculates a percentage of every amount, like ``5 % money``.
+        """
+        if isinstance(other, (Money, MoneyArray)):
+            raise TypeError, 'invalid monetary operation'
+        return self._scaled_by(other, percentage=True)
+
+    #
+    # Comparisons
+    #
+
+    def _compare(self, other, op, equality=False):
+        theirs = self._coerce(other)
+        if theirs is None:
+            if self.exponent is not None and isinstance(other, (int, long, Decimal)):
+                scaled = Decimal(other).scaleb(self.exponent)
+                if scaled == scaled.to_integral() and abs(scaled) <= _INT64_MAX:
+                    return op(self.amounts, int(scaled))
+            return op(self.decimals(), other).astype(bool)
+        same = self.currencies == theirs.currencies
+        if not equality and not same.all():
+            raise TypeError, 'can not compare different currencies'
+        mine, theirs, exponent = self._aligned(theirs)
+        result = op(mine, theirs).astype(bool)
+        if equality:
+            if op is numpy.equal:
+                return result & same
+            return result | ~same
+        return result
+
+    def __eq__(self, other):
+        return self._compare(other, numpy.equal, equality=True)
+
+    def __ne__(self, other):
+        return self._compare(other, numpy.not_equal, equality=True)
+
+    def __lt__(self, other):
+        return self._compare(other, numpy.less)
+
+    def __le__(self, other):
+        return self._compare(other, numpy.less_equal)
+
+    def __gt__(self, other):
+        return self._compare(other, numpy.greater)
+
+    def __ge__(self, other):
+        return self._compare(other, numpy.greater_equal)
+
+    #
+    # Reductions and conversions
+    #
+
+    def sum(self):
+        """
+        Totals the array into a single Money.  All amounts must share a
+        currency.
+        """
+        codes = set(self.currencies)
+        if len(codes) > 1:
+            raise TypeError, 'can not add different currencies'
+        if not codes:
+            return Money()
+        if self.exponent is None:
+            total = sum(self.amounts, Decimal(0))
+        else:
+            if _fits(self.amounts, len(self.amounts)):
+                units = int(self.amounts.sum())
+            else:
+                units = sum(int(v) for v in self.amounts)
+            # a Decimal sum has the places of the addend with most
+            places = int(self.places.max())
+            total = Decimal(units // 10 ** (self.exponent - places)).scaleb(-places)
+        return Money(total, codes.pop())
+
+    def quantize(self, exp, rounding=None):
+        """
+        Quantizes every amount, as Decimal.quantize(exp, rounding) would.
+        """
+        if rounding is None:
+            rounding = getcontext().rounding
+        target = _int64_exponent(Decimal(exp).copy_abs())
+        if self.exponent is not None and target is not None:
+            if target >= self.exponent:
+                amounts = self._rescaled(target)
+                if amounts is not None:
+                    return self._like(amounts, target)
+            else:
+                amounts = _rounded_division(self.amounts, 10 ** (self.exponent - target), rounding)
+                # negative amounts rounded to zero are negative zeros
+                if amounts is not None and not ((amounts == 0) & (self.amounts < 0)).any():
+                    return self._like(amounts, target)
+        quantized = numpy.empty(len(self), dtype=object)
+        quantized[:] = [d.quantize(exp, rounding) for d in self.decimals()]
+        return self._like(quantized)
+
+    def convert_to(self, currency):
+        """
+        Converts every amount to ``currency``, with the same arithmetic as
+        Money.convert_to.
+        """
+        table = rate_table()
+        provider = currency_provider()
+        decimals = self.decimals()
+        converted = numpy.empty(len(self), dtype=object)
+        for code in set(self.currencies):
+            mask = self.currencies == code
+            source = provider[code]
+            factors = table.factors(source, currency)
+            if factors is not None:
+                divisor, multiplier = factors
+                if divisor is None:
+                    converted[mask] = decimals[mask] * multiplier
+                else:
+                    converted[mask] = decimals[mask] / divisor * multiplier
+                continue
+            assert currency.exchange_rate, 'No exchange rate defined'
+            if source == provider.get_default():
+                converted[mask] = decimals[mask] * currency.exchange_rate
+            else:
+                assert source.exchange_rate, 'No exchange rate defined for: %s' % source
+                converted[mask] = decimals[mask] / source.exchange_rate * currency.exchange_rate
+        currencies = numpy.empty(len(self), dtype=object)
+        currencies[:] = _code(currency)
+        return self._like(converted, currencies=currencies)
+
+    def allocate(self, ratios):
+        """
+        Splits every amount across ``ratios`` exactly as Money.allocate
+        does, returning one MoneyArray per ratio.  Each amount is split in
+        the minor unit of its currency, or in units of its last decimal
+        place when it has more places.
+        """
+        ratios, total = _integer_ratios(ratios)
+        amounts = None
+        if self.exponent is not None and len(self):
+            provider = currency_provider()
+            minor = dict((code, provider[code].exponent) for code in set(self.currencies))
+            exponents = numpy.maximum(self.places, [minor[code] for code in self.currencies])
+            common = int(exponents.max())
+            if _fits(self.amounts, 10 ** max(common - self.exponent, 0) * max(ratios)):
+                # each amount as a count of its own units
+                up = exponents >= self.exponent
+                amounts = numpy.where(up, self.amounts * _powers(numpy.maximum(exponents - self.exponent, 0)),
+                                      self.amounts // _powers(numpy.maximum(self.exponent - exponents, 0)))
+                scales = _powers(common - exponents)
+                if not _fits(amounts * scales, max(ratios)):
+                    amounts = None
+        if amounts is None:
+            parts = Money.allocate_many(self.to_moneys(), ratios)
+            return [MoneyArray.from_moneys(column) for column in zip(*parts)]
+        weights = numpy.array(ratios, dtype=numpy.int64)
+        shares, remainders = numpy.divmod(amounts[:, numpy.newaxis] * weights, total)
+        leftover = amounts - shares.sum(axis=1)
+        # a stable sort hands leftover units to the earlier parts on ties
+        order = numpy.argsort(-remainders, axis=1, kind='mergesort')
+        ranks = numpy.empty_like(order)
+        ranks[numpy.arange(len(amounts))[:, numpy.newaxis], order] = numpy.arange(len(ratios))
+        shares += ranks < leftover[:, numpy.newaxis]
+        return [self._like(shares[:, i] * scales, common, places=exponents)
+                for i in range(len(ratios))]
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+from decimal import Decimal
+
+from money.Money import Money, BaseCurrency, currency_provider, _resolve_currency
+
+__all__ = ('MoneyBag',)
+
+class MoneyBag(object):
+    """
+    Accumulates Money in any number of currencies, keeping one subtotal per
+    currency.  Nothing is converted until total() is asked for, and then
+    each subtotal is converted exactly once.
+
+    Bags can be merged, which makes them suitable as partial results of a
+    map-reduce style aggregation:
+
+    >>> bag = MoneyBag([Money(10, "USD"), Money(5, "EUR"), Money(1, "USD")])
+    >>> bag["USD"]
+    USD 11.00
+    >>> (bag + MoneyBag([Money(2, "EUR")]))["EUR"]
+    EUR  7.00
+    """
+
+    def __init__(self, moneys=()):
+        self._amounts = {}
+        self._currencies = {}
+        self.update(moneys)
+
+    def add(self, money):
+        """
+        Adds one Money to the bag.
+        """
+        code = money.currency.code
+        amounts = self._amounts
+        if code in amounts:
+            amounts[code] += money.amount
+        else:
+            amounts[code] = money.amount
+            self._currencies[code] = money.currency
+
+    def subtract(self, money):
+        """
+        Subtracts one Money from the bag.
+        """
+        self.add(-money)
+
+    def update(self, moneys):
+        """
+        Adds every Money of an iterable to the bag.
+        """
+        amounts = self._amounts
+        currencies = self._currencies
+        for money in moneys:
+            code = money.currency.code
+            if code in amounts:
+                amounts[code] += money.amount
+            else:
+                amounts[code] = money.amount
+                currencies[code] = money.currency
+
+    def merge(self, other):
+        """
+        Adds the subtotals of another bag to this one.
+        """
+        amounts = self._amounts
+        for code, amount in other._amounts.iteritems():
+            if code in amounts:
+                amounts[code] += amount
+            else:
+                amounts[code] = amount
+                self._currencies[code] = other._currencies[code]
+
+    def copy(self):
+        bag = MoneyBag()
+        bag.merge(self)
+        return bag
+
+    def __add__(self, other):
+        bag = self.copy()
+        if isinstance(other, MoneyBag):
+            bag.merge(other)
+        elif isinstance(other, Money):
+            bag.add(other)
+        else:
+            return NotImplemented
+        return bag
+
+    __radd__ = __add__
+
+    def __iadd__(self, other):
+        if isinstance(other, MoneyBag):
+            self.merge(other)
+        elif isinstance(other, Money):
+            self.add(other)
+        else:
+            return NotImplemented
+        return self
+
+    def __getitem__(self, currency):
+        """
+        The subtotal in ``currency`` (a currency or a currency code).
+        """
+        code = getattr(currency, 'code', currency)
+        if code in self._amounts:
+            return Money(self._amounts[code], self._currencies[code])
+        if isinstance(currency, BaseCurrency):
+            return Money(Decimal(0), currency)
+        return Money(Decimal(0), code)
+
+    def __contains__(self, currency):
+        return getattr(currency, 'code', currency) in self._amounts
+
+    def __iter__(self):
+        """
+        Iterates over the subtotals as Money.
+        """
+        for code, amount in self._amounts.iteritems():
+            yield Money(amount, self._currencies[code])
+
+    def __len__(self):
+        return len(self._amounts)
+
+    def __nonzero__(self):
+        for amount in self._amounts.itervalues():
+            if amount:
+                return True
+        return False
+
+    def __eq__(self, other):
+        if not isinstance(other, MoneyBag):
+            return NotImplemented
+        return self._nonzero_amounts() == other._nonzero_amounts()
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def _nonzero_amounts(self):
+        return dict((code, amount) for code, amount in self._amounts.iteritems() if amount)
+
+    def __repr__(self):
+        return 'MoneyBag(%r)' % list(self)
+
+    def currencies(self):
+        return self._currencies.values()
+
+    def total(self, currency=None):
+        """
+        Converts every subtotal to ``currency`` (the default currency when
+        not given) with Money.convert_to and adds them up.
+        """
+        default = currency_provider().get_default()
+        if currency is None:
+            currency = default
+        elif not isinstance(currency, BaseCurrency):
+            currency = _resolve_currency(currency)
+        total = Decimal(0)
+        for code, amount in self._amounts.iteritems():
+            subtotal = Money(amount, self._currencies[code])
+            if subtotal.currency == currency:
+                total += amount
+            elif currency == default:
+                total += subtotal.convert_to_default().amount
+            else:
+                total += subtotal.convert_to(currency).amount
+        return Money(total, currency)
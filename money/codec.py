@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+A compact binary encoding of Money.
+
+Each value is 11 bytes: the ISO numeric code of its currency (unsigned
+short), the exponent (signed char) and the amount as an integer count of
+10**-exponent units (signed long long), all big-endian.  Amounts round-trip
+exactly, including their number of decimal places.
+
+>>> loads(dumps(Money("12.50", "EUR")))
+EUR 12.50
+>>> len(dumps_many([Money(1, "USD"), Money(2, "JPY")]))
+26
+"""
+import struct
+from decimal import Decimal
+
+from money.Money import Money, IntegerMoney, Currency, currency_provider, _resolve_currency
+from money.currencies import currency_table
+
+__all__ = ('dumps', 'loads', 'dumps_many', 'loads_many', 'RECORD_SIZE')
+
+_RECORD = struct.Struct('>Hbq')
+_COUNT = struct.Struct('>I')
+
+RECORD_SIZE = _RECORD.size
+
+def _decimal_units(amount):
+    """
+    Returns (units, exponent) of a Decimal, such that it equals
+    ``units * 10**-exponent``, raising ValueError if it is not finite.
+    """
+    # str() of a Decimal is much cheaper than as_tuple(), and for the usual
+    # amounts it is in plain notation
+    text = str(amount)
+    if 'E' not in text:
+        whole, point, fraction = text.partition('.')
+        try:
+            return int(whole + fraction), len(fraction)
+        except ValueError:
+            raise ValueError, 'can not encode %s' % amount
+    sign, digits, exponent = amount.as_tuple()
+    units = int(''.join(map(str, digits)))
+    if sign:
+        units = -units
+    return units, -exponent
+
+def _units(money):
+    """
+    Returns (units, exponent) of a Money, raising ValueError if it does not
+    fit the encoding.
+    """
+    if isinstance(money, IntegerMoney):
+        return money.units, money.exponent
+    return _decimal_units(money.amount)
+
+def _numeric(currency):
+    try:
+        return int(currency.numeric)
+    except ValueError:
+        raise ValueError, 'currency %s has no numeric code' % currency
+
+def _pack_into(buffer, offset, money):
+    units, exponent = _units(money)
+    try:
+        _RECORD.pack_into(buffer, offset, _numeric(money.currency), exponent, units)
+    except struct.error:
+        raise ValueError, 'can not encode %r' % money
+
+def _lookup(numeric):
+    """
+    The currency with ISO numeric code ``numeric`` in the current provider.
+    Providers that neither index their currencies by numeric code
+    (by_numeric) nor are a dict of them, such as the Django Currency
+    manager, are asked for the ISO alpha code of ``numeric``.
+    """
+    provider = currency_provider()
+    by_numeric = getattr(provider, 'by_numeric', None)
+    if by_numeric is not None:
+        return by_numeric(numeric)
+    if isinstance(provider, dict):
+        for currency in dict.itervalues(provider):
+            if str(currency.numeric).isdigit() and int(currency.numeric) == numeric:
+                return currency
+        raise KeyError(numeric)
+    return _resolve_currency(currency_table().by_numeric(numeric).code)
+
+def _money(money_class, units, exponent, currency):
+    if issubclass(money_class, IntegerMoney):
+        money = object.__new__(money_class)
+        money.units = units
+        money.exponent = exponent
+        money.currency = currency
+        money.allow_conversion = False
+        return money
+    return money_class(Decimal('%dE%d' % (units, -exponent)), currency)
+
+def dumps(money):
+    """
+    Encodes one Money as an 11 byte string.  Raises ValueError for amounts
+    that are not finite or do not fit in 64 bits, and for currencies without
+    a numeric code.
+    """
+    units, exponent = _units(money)
+    try:
+        return _RECORD.pack(_numeric(money.currency), exponent, units)
+    except struct.error:
+        raise ValueError, 'can not encode %r' % money
+
+def loads(data, money_class=Money):
+    """
+    Decodes a Money encoded by dumps.
+    """
+    numeric, exponent, units = _RECORD.unpack_from(data)
+    return _money(money_class, units, exponent, _lookup(numeric))
+
+def dumps_many(moneys):
+    """
+    Encodes a sequence of Money into one bytearray: a four byte count
+    followed by the records.
+    """
+    moneys = list(moneys)
+    buffer = bytearray(_COUNT.size + RECORD_SIZE * len(moneys))
+    _COUNT.pack_into(buffer, 0, len(moneys))
+    offset = _COUNT.size
+    for money in moneys:
+        _pack_into(buffer, offset, money)
+        offset += RECORD_SIZE
+    return buffer
+
+def loads_many(data, money_class=Money):
+    """
+    Decodes a buffer (str, bytearray, buffer or memoryview) written by
+    dumps_many into a list of Money.  Records are unpacked in place, and
+    each distinct currency is looked up once.
+    """
+    count, = _COUNT.unpack_from(data)
+    unpack_from = _RECORD.unpack_from
+    currencies = {}
+    results = []
+    for offset in xrange(_COUNT.size, _COUNT.size + RECORD_SIZE * count, RECORD_SIZE):
+        numeric, exponent, units = unpack_from(data, offset)
+        currency = currencies.get(numeric)
+        if currency is None:
+            currency = currencies[numeric] = _lookup(numeric)
+        results.append(_money(money_class, units, exponent, currency))
+    return results
+
+def _from_record(money_class, data, code=None):
+    """
+    Unpickles the compact form.  The currency is looked up by its alpha
+    code in the provider of the loading process, which need not be the one
+    it was pickled with, and by the numeric code of the record if that
+    fails (or for pickles that have no alpha code).
+    """
+    numeric, exponent, units = _RECORD.unpack_from(data)
+    currency = None
+    if code is not None:
+        try:
+            currency = _resolve_currency(code)
+        except KeyError:
+            pass
+    if currency is None:
+        currency = _lookup(numeric)
+    return _money(money_class, units, exponent, currency)
+
+def _reduce(money):
+    """
+    The compact pickle form of a Money, or None when the compact encoding
+    would lose something: allow_conversion, a currency other than an ISO
+    currency with its ISO numeric code, an amount that does not fit, or the
+    sign of a negative zero.  The provider is not asked, so pickling makes
+    no queries.
+    """
+    if money.allow_conversion or (not money.amount and money.amount.is_signed()):
+        return None
+    currency = money.currency
+    if type(currency) is not Currency:
+        return None
+    iso = dict.get(currency_table(), currency.code)
+    if iso is None or iso.numeric != currency.numeric:
+        return None
+    try:
+        data = dumps(money)
+    except ValueError:
+        return None
+    return (_from_record, (money.__class__, data, currency.code))
@@ -32,10 +32,16 @@ class CurrencyField(models.ForeignKey):
         return (field_class, args, kwargs)
 
 class MoneyProxy(Money):
+    __slots__ = ('field', 'instance', '_amount')
+
     def __init__(self, field, instance, amount, currency):
         self.field = field
         self.instance = instance
         super(MoneyProxy, self).__init__(amount, currency)
+
+    def __reduce__(self):
+        # a pickled proxy is detached from its model instance
+        return (Money, (self.amount, self.currency, self.allow_conversion))
     
     def _set_amount(self, amount):
         self._amount = amount
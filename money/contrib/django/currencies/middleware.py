@@ -0,0 +1,25 @@
+from money.contrib.django.currencies.models import rate_snapshot
+
+class RateSnapshotMiddleware(object):
+    """
+    Serves each request with a rate snapshot of the Currency table as its
+    currency provider, so that the request sees one set of rates and looks
+    currencies up without further queries.
+    """
+
+    def process_request(self, request):
+        scope = rate_snapshot()
+        scope.__enter__()
+        request._rate_snapshot = scope
+
+    def _close(self, request):
+        scope = request.__dict__.pop('_rate_snapshot', None)
+        if scope is not None:
+            scope.__exit__(None, None, None)
+
+    def process_response(self, request, response):
+        self._close(request)
+        return response
+
+    def process_exception(self, request, exception):
+        self._close(request)
@@ -14,7 +14,7 @@ class CurrencyManager(models.Manager):
     
     def __getitem__(self, code):
         try:
-            return self.get(code=code)
+            return self.get(code=str(code).upper())
         except self.model.DoesNotExist:
             raise KeyError, 'currency "%s" was not found' % code
 
@@ -35,16 +35,75 @@ class Currency(models.Model, money.BaseCurrency):
     
     def __unicode__(self):
         return self.name
+
+    def _get_exponent(self):
+        try:
+            return ORIGINAL_CURRENCIES[self.code].exponent
+        except KeyError:
+            return money.BaseCurrency.exponent
+
+    exponent = property(_get_exponent)
     
     def save(self, *args, **kwargs):
         if self.default and self.pk:
             type(self).objects.exclude(pk=self.pk, default=False).update(default=False)
-        return models.Model.save(self, *args, **kwargs)
+        result = models.Model.save(self, *args, **kwargs)
+        money.rates_changed()
+        return result
     
     class Meta:
         ordering = ['-default', 'code']
         verbose_name_plural = "currencies"
 
+class RateSnapshot(dict):
+    """
+    A read-only currency provider holding every Currency as it was when the
+    snapshot was loaded, in one query.  Within a scope using it (see
+    rate_snapshot) currency lookups and conversions make no queries, and
+    all of them use the same rates even if the table changes meanwhile.
+    """
+    rates_by_code = True
+
+    def __init__(self, currencies):
+        self.default = None
+        for currency in currencies:
+            dict.__setitem__(self, currency.code, currency)
+            if currency.default:
+                self.default = currency
+
+    @classmethod
+    def load(cls, queryset=None):
+        if queryset is None:
+            queryset = Currency.objects.all()
+        return cls(queryset)
+
+    def get_default(self):
+        if self.default is None:
+            raise Currency.DoesNotExist, 'there is no default currency'
+        return self.default
+
+    def __missing__(self, code):
+        code = str(code).upper()
+        if code in self:
+            return dict.__getitem__(self, code)
+        raise KeyError, 'currency "%s" was not found' % code
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError, 'rate snapshots can not be changed'
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _read_only
+
+def rate_snapshot(queryset=None):
+    """
+    Returns a CurrencyScope with a newly loaded RateSnapshot as provider::
+
+        with rate_snapshot():
+            total = sum(price.convert_to(currency) for price in prices)
+
+    RateSnapshotMiddleware does the same for every request.
+    """
+    return money.CurrencyScope(RateSnapshot.load(queryset))
+
 ORIGINAL_CURRENCIES = money.currency_provider()
 money.set_currency_provider(Currency.objects)
 
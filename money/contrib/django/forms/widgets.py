@@ -4,10 +4,13 @@ from decimal import Decimal
 
 __all__ = ('InputMoneyWidget', 'CurrencySelect',)
 
-CURRENCY_CHOICES = ((c.code, c.name) for i, c in currency_provider().items() if c.code != 'XXX')
+def currency_choices():
+    return [(c.code, c.name) for i, c in currency_provider().items() if c.code != 'XXX']
 
 class CurrencySelect(forms.Select):
-    def __init__(self, attrs=None, choices=CURRENCY_CHOICES):
+    def __init__(self, attrs=None, choices=None):
+        if choices is None:
+            choices = currency_choices()
         super(CurrencySelect, self).__init__(attrs, choices)
     
 class InputMoneyWidget(forms.TextInput):
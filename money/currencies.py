@@ -1,171 +1,330 @@
+import sys
+import threading
+import types
+
 from Money import Currency
 
 class CurrencySource(dict):
+    """
+    The registry of currencies, keyed by ISO alpha code.
+
+    Codes in another case ('usd') are normalized on their first lookup and
+    the currency remembered, so later lookups do no string work.  Indexes by numeric code
+    and by country are built on first use and dropped whenever the registry
+    is modified.
+    """
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self._aliases = {}
+        self._indexes = None
+
     def get_default(self):
         return self['XXX']
 
-CURRENCY = CurrencySource()
-CURRENCY['XXX'] = Currency(code="XXX", numeric="999")
+    def __missing__(self, key):
+        aliases = self._aliases
+        if key in aliases:
+            return aliases[key]
+        if not isinstance(key, basestring):
+            raise KeyError(key)
+        code = key.strip().upper()
+        if code == key:
+            raise KeyError(key)
+        currency = aliases[key] = dict.__getitem__(self, code)
+        return currency
+
+    def _changed(self):
+        self._aliases = {}
+        self._indexes = None
+
+    def __setitem__(self, code, currency):
+        dict.__setitem__(self, code, currency)
+        self._changed()
+
+    def __delitem__(self, code):
+        dict.__delitem__(self, code)
+        self._changed()
+
+    def clear(self):
+        dict.clear(self)
+        self._changed()
+
+    def pop(self, *args):
+        result = dict.pop(self, *args)
+        self._changed()
+        return result
+
+    def popitem(self):
+        result = dict.popitem(self)
+        self._changed()
+        return result
+
+    def setdefault(self, code, currency=None):
+        result = dict.setdefault(self, code, currency)
+        self._changed()
+        return result
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs)
+        self._changed()
+
+    def _build_indexes(self):
+        numeric = {}
+        countries = {}
+        for currency in self.itervalues():
+            if str(currency.numeric).isdigit():
+                numeric.setdefault(int(currency.numeric), currency)
+            for country in currency.countries:
+                countries.setdefault(country.upper(), []).append(currency)
+        for country, currencies in countries.items():
+            countries[country] = tuple(currencies)
+        self._indexes = numeric, countries
+        return self._indexes
+
+    def by_numeric(self, numeric):
+        """
+        The currency with ISO numeric code ``numeric`` ('840' or 840).
+        Raises KeyError if there is none.
+        """
+        indexes = self._indexes or self._build_indexes()
+        try:
+            return indexes[0][int(numeric)]
+        except ValueError:
+            raise KeyError(numeric)
+
+    def by_country(self, country):
+        """
+        The currencies used in ``country`` (an ISO country name, in any
+        case), as a tuple.
+        """
+        indexes = self._indexes or self._build_indexes()
+        return indexes[1].get(country.strip().upper(), ())
+
 #
-# Definitions of ISO 4217 Currencies
+# Definitions of ISO 4217 Currencies, as (code, numeric, name, countries,
+# exponent) rows.  exponent is the number of minor unit digits; it is 2 for
+# the codes that have none (funds, precious metals, XXX).
 # Source: http://www.iso.org/iso/support/faqs/faqs_widely_used_standards/widely_used_standards_other/currency_codes/currency_codes_list-1.htm
 #
 
-CURRENCY['BZD'] = Currency(code='BZD', numeric='084', name='Belize Dollar', countries=['BELIZE'])
-CURRENCY['YER'] = Currency(code='YER', numeric='886', name='Yemeni Rial', countries=['YEMEN'])
-CURRENCY['XBA'] = Currency(code='XBA', numeric='955', name='Bond Markets Units European Composite Unit (EURCO)', countries=[])
-CURRENCY['SLL'] = Currency(code='SLL', numeric='694', name='Leone', countries=['SIERRA LEONE'])
-CURRENCY['ERN'] = Currency(code='ERN', numeric='232', name='Nakfa', countries=['ERITREA'])
-CURRENCY['NGN'] = Currency(code='NGN', numeric='566', name='Naira', countries=['NIGERIA'])
-CURRENCY['CRC'] = Currency(code='CRC', numeric='188', name='Costa Rican Colon', countries=['COSTA RICA'])
-CURRENCY['VEF'] = Currency(code='VEF', numeric='937', name='Bolivar Fuerte', countries=['VENEZUELA'])
-CURRENCY['LAK'] = Currency(code='LAK', numeric='418', name='Kip', countries=['LAO PEOPLES DEMOCRATIC REPUBLIC'])
-CURRENCY['DZD'] = Currency(code='DZD', numeric='012', name='Algerian Dinar', countries=['ALGERIA'])
-CURRENCY['SZL'] = Currency(code='SZL', numeric='748', name='Lilangeni', countries=['SWAZILAND'])
-CURRENCY['MOP'] = Currency(code='MOP', numeric='446', name='Pataca', countries=['MACAO'])
-CURRENCY['BYR'] = Currency(code='BYR', numeric='974', name='Belarussian Ruble', countries=['BELARUS'])
-CURRENCY['MUR'] = Currency(code='MUR', numeric='480', name='Mauritius Rupee', countries=['MAURITIUS'])
-CURRENCY['WST'] = Currency(code='WST', numeric='882', name='Tala', countries=['SAMOA'])
-CURRENCY['LRD'] = Currency(code='LRD', numeric='430', name='Liberian Dollar', countries=['LIBERIA'])
-CURRENCY['MMK'] = Currency(code='MMK', numeric='104', name='Kyat', countries=['MYANMAR'])
-CURRENCY['KGS'] = Currency(code='KGS', numeric='417', name='Som', countries=['KYRGYZSTAN'])
-CURRENCY['PYG'] = Currency(code='PYG', numeric='600', name='Guarani', countries=['PARAGUAY'])
-CURRENCY['IDR'] = Currency(code='IDR', numeric='360', name='Rupiah', countries=['INDONESIA'])
-CURRENCY['XBD'] = Currency(code='XBD', numeric='958', name='European Unit of Account 17(E.U.A.-17)', countries=[])
-CURRENCY['GTQ'] = Currency(code='GTQ', numeric='320', name='Quetzal', countries=['GUATEMALA'])
-CURRENCY['CAD'] = Currency(code='CAD', numeric='124', name='Canadian Dollar', countries=['CANADA'])
-CURRENCY['AWG'] = Currency(code='AWG', numeric='533', name='Aruban Guilder', countries=['ARUBA'])
-CURRENCY['TTD'] = Currency(code='TTD', numeric='780', name='Trinidad and Tobago Dollar', countries=['TRINIDAD AND TOBAGO'])
-CURRENCY['PKR'] = Currency(code='PKR', numeric='586', name='Pakistan Rupee', countries=['PAKISTAN'])
-CURRENCY['XBC'] = Currency(code='XBC', numeric='957', name='European Unit of Account 9(E.U.A.-9)', countries=[])
-CURRENCY['UZS'] = Currency(code='UZS', numeric='860', name='Uzbekistan Sum', countries=['UZBEKISTAN'])
-CURRENCY['XCD'] = Currency(code='XCD', numeric='951', name='East Caribbean Dollar', countries=['ANGUILLA', 'ANTIGUA AND BARBUDA', 'DOMINICA', 'GRENADA', 'MONTSERRAT', 'SAINT KITTS AND NEVIS', 'SAINT LUCIA', 'SAINT VINCENT AND THE GRENADINES'])
-CURRENCY['VUV'] = Currency(code='VUV', numeric='548', name='Vatu', countries=['VANUATU'])
-CURRENCY['KMF'] = Currency(code='KMF', numeric='174', name='Comoro Franc', countries=['COMOROS'])
-CURRENCY['AZN'] = Currency(code='AZN', numeric='944', name='Azerbaijanian Manat', countries=['AZERBAIJAN'])
-CURRENCY['XPD'] = Currency(code='XPD', numeric='964', name='Palladium', countries=[])
-CURRENCY['MNT'] = Currency(code='MNT', numeric='496', name='Tugrik', countries=['MONGOLIA'])
-CURRENCY['ANG'] = Currency(code='ANG', numeric='532', name='Netherlands Antillian Guilder', countries=['NETHERLANDS ANTILLES'])
-CURRENCY['LBP'] = Currency(code='LBP', numeric='422', name='Lebanese Pound', countries=['LEBANON'])
-CURRENCY['KES'] = Currency(code='KES', numeric='404', name='Kenyan Shilling', countries=['KENYA'])
-CURRENCY['GBP'] = Currency(code='GBP', numeric='826', name='Pound Sterling', countries=['UNITED KINGDOM'])
-CURRENCY['SEK'] = Currency(code='SEK', numeric='752', name='Swedish Krona', countries=['SWEDEN'])
-CURRENCY['AFN'] = Currency(code='AFN', numeric='971', name='Afghani', countries=['AFGHANISTAN'])
-CURRENCY['KZT'] = Currency(code='KZT', numeric='398', name='Tenge', countries=['KAZAKHSTAN'])
-CURRENCY['ZMK'] = Currency(code='ZMK', numeric='894', name='Kwacha', countries=['ZAMBIA'])
-CURRENCY['SKK'] = Currency(code='SKK', numeric='703', name='Slovak Koruna', countries=['SLOVAKIA'])
-CURRENCY['DKK'] = Currency(code='DKK', numeric='208', name='Danish Krone', countries=['DENMARK', 'FAROE ISLANDS', 'GREENLAND'])
-CURRENCY['TMM'] = Currency(code='TMM', numeric='795', name='Manat', countries=['TURKMENISTAN'])
-CURRENCY['AMD'] = Currency(code='AMD', numeric='051', name='Armenian Dram', countries=['ARMENIA'])
-CURRENCY['SCR'] = Currency(code='SCR', numeric='690', name='Seychelles Rupee', countries=['SEYCHELLES'])
-CURRENCY['FJD'] = Currency(code='FJD', numeric='242', name='Fiji Dollar', countries=['FIJI'])
-CURRENCY['SHP'] = Currency(code='SHP', numeric='654', name='Saint Helena Pound', countries=['SAINT HELENA'])
-CURRENCY['ALL'] = Currency(code='ALL', numeric='008', name='Lek', countries=['ALBANIA'])
-CURRENCY['TOP'] = Currency(code='TOP', numeric='776', name='Paanga', countries=['TONGA'])
-CURRENCY['UGX'] = Currency(code='UGX', numeric='800', name='Uganda Shilling', countries=['UGANDA'])
-CURRENCY['OMR'] = Currency(code='OMR', numeric='512', name='Rial Omani', countries=['OMAN'])
-CURRENCY['DJF'] = Currency(code='DJF', numeric='262', name='Djibouti Franc', countries=['DJIBOUTI'])
-CURRENCY['BND'] = Currency(code='BND', numeric='096', name='Brunei Dollar', countries=['BRUNEI DARUSSALAM'])
-CURRENCY['TND'] = Currency(code='TND', numeric='788', name='Tunisian Dinar', countries=['TUNISIA'])
-CURRENCY['SBD'] = Currency(code='SBD', numeric='090', name='Solomon Islands Dollar', countries=['SOLOMON ISLANDS'])
-CURRENCY['GHS'] = Currency(code='GHS', numeric='936', name='Ghana Cedi', countries=['GHANA'])
-CURRENCY['GNF'] = Currency(code='GNF', numeric='324', name='Guinea Franc', countries=['GUINEA'])
-CURRENCY['CVE'] = Currency(code='CVE', numeric='132', name='Cape Verde Escudo', countries=['CAPE VERDE'])
-CURRENCY['ARS'] = Currency(code='ARS', numeric='032', name='Argentine Peso', countries=['ARGENTINA'])
-CURRENCY['GMD'] = Currency(code='GMD', numeric='270', name='Dalasi', countries=['GAMBIA'])
-CURRENCY['ZWD'] = Currency(code='ZWD', numeric='716', name='Zimbabwe Dollar', countries=['ZIMBABWE'])
-CURRENCY['MWK'] = Currency(code='MWK', numeric='454', name='Kwacha', countries=['MALAWI'])
-CURRENCY['BDT'] = Currency(code='BDT', numeric='050', name='Taka', countries=['BANGLADESH'])
-CURRENCY['KWD'] = Currency(code='KWD', numeric='414', name='Kuwaiti Dinar', countries=['KUWAIT'])
-CURRENCY['EUR'] = Currency(code='EUR', numeric='978', name='Euro', countries=['ANDORRA', 'AUSTRIA', 'BELGIUM', 'FINLAND', 'FRANCE', 'FRENCH GUIANA', 'FRENCH SOUTHERN TERRITORIES', 'GERMANY', 'GREECE', 'GUADELOUPE', 'IRELAND', 'ITALY', 'LUXEMBOURG', 'MARTINIQUE', 'MAYOTTE', 'MONACO', 'MONTENEGRO', 'NETHERLANDS', 'PORTUGAL', 'R.UNION', 'SAINT PIERRE AND MIQUELON', 'SAN MARINO', 'SLOVENIA', 'SPAIN'])
-CURRENCY['CHF'] = Currency(code='CHF', numeric='756', name='Swiss Franc', countries=['LIECHTENSTEIN'])
-CURRENCY['XAG'] = Currency(code='XAG', numeric='961', name='Silver', countries=[])
-CURRENCY['SRD'] = Currency(code='SRD', numeric='968', name='Surinam Dollar', countries=['SURINAME'])
-CURRENCY['DOP'] = Currency(code='DOP', numeric='214', name='Dominican Peso', countries=['DOMINICAN REPUBLIC'])
-CURRENCY['PEN'] = Currency(code='PEN', numeric='604', name='Nuevo Sol', countries=['PERU'])
-CURRENCY['KPW'] = Currency(code='KPW', numeric='408', name='North Korean Won', countries=['KOREA'])
-CURRENCY['SGD'] = Currency(code='SGD', numeric='702', name='Singapore Dollar', countries=['SINGAPORE'])
-CURRENCY['TWD'] = Currency(code='TWD', numeric='901', name='New Taiwan Dollar', countries=['TAIWAN'])
-CURRENCY['USD'] = Currency(code='USD', numeric='840', name='US Dollar', countries=['AMERICAN SAMOA', 'BRITISH INDIAN OCEAN TERRITORY', 'ECUADOR', 'GUAM', 'MARSHALL ISLANDS', 'MICRONESIA', 'NORTHERN MARIANA ISLANDS', 'PALAU', 'PUERTO RICO', 'TIMOR-LESTE', 'TURKS AND CAICOS ISLANDS', 'UNITED STATES MINOR OUTLYING ISLANDS', 'VIRGIN ISLANDS (BRITISH)', 'VIRGIN ISLANDS (U.S.)'])
-CURRENCY['BGN'] = Currency(code='BGN', numeric='975', name='Bulgarian Lev', countries=['BULGARIA'])
-CURRENCY['MAD'] = Currency(code='MAD', numeric='504', name='Moroccan Dirham', countries=['MOROCCO', 'WESTERN SAHARA'])
-CURRENCY['XXX'] = Currency(code='XXX', numeric='999', name='The codes assigned for transactions where no currency is involved are:', countries=[])
-CURRENCY['SAR'] = Currency(code='SAR', numeric='682', name='Saudi Riyal', countries=['SAUDI ARABIA'])
-CURRENCY['AUD'] = Currency(code='AUD', numeric='036', name='Australian Dollar', countries=['AUSTRALIA', 'CHRISTMAS ISLAND', 'COCOS (KEELING) ISLANDS', 'HEARD ISLAND AND MCDONALD ISLANDS', 'KIRIBATI', 'NAURU', 'NORFOLK ISLAND', 'TUVALU'])
-CURRENCY['KYD'] = Currency(code='KYD', numeric='136', name='Cayman Islands Dollar', countries=['CAYMAN ISLANDS'])
-CURRENCY['KRW'] = Currency(code='KRW', numeric='410', name='Won', countries=['KOREA'])
-CURRENCY['GIP'] = Currency(code='GIP', numeric='292', name='Gibraltar Pound', countries=['GIBRALTAR'])
-CURRENCY['TRY'] = Currency(code='TRY', numeric='949', name='New Turkish Lira', countries=['TURKEY'])
-CURRENCY['XAU'] = Currency(code='XAU', numeric='959', name='Gold', countries=[])
-CURRENCY['CZK'] = Currency(code='CZK', numeric='203', name='Czech Koruna', countries=['CZECH REPUBLIC'])
-CURRENCY['JMD'] = Currency(code='JMD', numeric='388', name='Jamaican Dollar', countries=['JAMAICA'])
-CURRENCY['BSD'] = Currency(code='BSD', numeric='044', name='Bahamian Dollar', countries=['BAHAMAS'])
-CURRENCY['BWP'] = Currency(code='BWP', numeric='072', name='Pula', countries=['BOTSWANA'])
-CURRENCY['GYD'] = Currency(code='GYD', numeric='328', name='Guyana Dollar', countries=['GUYANA'])
-CURRENCY['XTS'] = Currency(code='XTS', numeric='963', name='Codes specifically reserved for testing purposes', countries=[])
-CURRENCY['LYD'] = Currency(code='LYD', numeric='434', name='Libyan Dinar', countries=['LIBYAN ARAB JAMAHIRIYA'])
-CURRENCY['EGP'] = Currency(code='EGP', numeric='818', name='Egyptian Pound', countries=['EGYPT'])
-CURRENCY['THB'] = Currency(code='THB', numeric='764', name='Baht', countries=['THAILAND'])
-CURRENCY['MKD'] = Currency(code='MKD', numeric='807', name='Denar', countries=['MACEDONIA'])
-CURRENCY['SDG'] = Currency(code='SDG', numeric='938', name='Sudanese Pound', countries=['SUDAN'])
-CURRENCY['AED'] = Currency(code='AED', numeric='784', name='UAE Dirham', countries=['UNITED ARAB EMIRATES'])
-CURRENCY['JOD'] = Currency(code='JOD', numeric='400', name='Jordanian Dinar', countries=['JORDAN'])
-CURRENCY['JPY'] = Currency(code='JPY', numeric='392', name='Yen', countries=['JAPAN'])
-CURRENCY['ZAR'] = Currency(code='ZAR', numeric='710', name='Rand', countries=['SOUTH AFRICA'])
-CURRENCY['HRK'] = Currency(code='HRK', numeric='191', name='Croatian Kuna', countries=['CROATIA'])
-CURRENCY['AOA'] = Currency(code='AOA', numeric='973', name='Kwanza', countries=['ANGOLA'])
-CURRENCY['RWF'] = Currency(code='RWF', numeric='646', name='Rwanda Franc', countries=['RWANDA'])
-CURRENCY['CUP'] = Currency(code='CUP', numeric='192', name='Cuban Peso', countries=['CUBA'])
-CURRENCY['XFO'] = Currency(code='XFO', numeric='Nil', name='Gold-Franc', countries=[])
-CURRENCY['BBD'] = Currency(code='BBD', numeric='052', name='Barbados Dollar', countries=['BARBADOS'])
-CURRENCY['PGK'] = Currency(code='PGK', numeric='598', name='Kina', countries=['PAPUA NEW GUINEA'])
-CURRENCY['LKR'] = Currency(code='LKR', numeric='144', name='Sri Lanka Rupee', countries=['SRI LANKA'])
-CURRENCY['RON'] = Currency(code='RON', numeric='946', name='New Leu', countries=['ROMANIA'])
-CURRENCY['PLN'] = Currency(code='PLN', numeric='985', name='Zloty', countries=['POLAND'])
-CURRENCY['IQD'] = Currency(code='IQD', numeric='368', name='Iraqi Dinar', countries=['IRAQ'])
-CURRENCY['TJS'] = Currency(code='TJS', numeric='972', name='Somoni', countries=['TAJIKISTAN'])
-CURRENCY['MDL'] = Currency(code='MDL', numeric='498', name='Moldovan Leu', countries=['MOLDOVA'])
-CURRENCY['MYR'] = Currency(code='MYR', numeric='458', name='Malaysian Ringgit', countries=['MALAYSIA'])
-CURRENCY['CNY'] = Currency(code='CNY', numeric='156', name='Yuan Renminbi', countries=['CHINA'])
-CURRENCY['LVL'] = Currency(code='LVL', numeric='428', name='Latvian Lats', countries=['LATVIA'])
-CURRENCY['INR'] = Currency(code='INR', numeric='356', name='Indian Rupee', countries=['INDIA'])
-CURRENCY['FKP'] = Currency(code='FKP', numeric='238', name='Falkland Islands Pound', countries=['FALKLAND ISLANDS (MALVINAS)'])
-CURRENCY['NIO'] = Currency(code='NIO', numeric='558', name='Cordoba Oro', countries=['NICARAGUA'])
-CURRENCY['PHP'] = Currency(code='PHP', numeric='608', name='Philippine Peso', countries=['PHILIPPINES'])
-CURRENCY['HNL'] = Currency(code='HNL', numeric='340', name='Lempira', countries=['HONDURAS'])
-CURRENCY['HKD'] = Currency(code='HKD', numeric='344', name='Hong Kong Dollar', countries=['HONG KONG'])
-CURRENCY['NZD'] = Currency(code='NZD', numeric='554', name='New Zealand Dollar', countries=['COOK ISLANDS', 'NEW ZEALAND', 'NIUE', 'PITCAIRN', 'TOKELAU'])
-CURRENCY['BRL'] = Currency(code='BRL', numeric='986', name='Brazilian Real', countries=['BRAZIL'])
-CURRENCY['RSD'] = Currency(code='RSD', numeric='941', name='Serbian Dinar', countries=['SERBIA'])
-CURRENCY['XBB'] = Currency(code='XBB', numeric='956', name='European Monetary Unit (E.M.U.-6)', countries=[])
-CURRENCY['EEK'] = Currency(code='EEK', numeric='233', name='Kroon', countries=['ESTONIA'])
-CURRENCY['SOS'] = Currency(code='SOS', numeric='706', name='Somali Shilling', countries=['SOMALIA'])
-CURRENCY['MZN'] = Currency(code='MZN', numeric='943', name='Metical', countries=['MOZAMBIQUE'])
-CURRENCY['XFU'] = Currency(code='XFU', numeric='Nil', name='UIC-Franc', countries=[])
-CURRENCY['NOK'] = Currency(code='NOK', numeric='578', name='Norwegian Krone', countries=['BOUVET ISLAND', 'NORWAY', 'SVALBARD AND JAN MAYEN'])
-CURRENCY['ISK'] = Currency(code='ISK', numeric='352', name='Iceland Krona', countries=['ICELAND'])
-CURRENCY['GEL'] = Currency(code='GEL', numeric='981', name='Lari', countries=['GEORGIA'])
-CURRENCY['ILS'] = Currency(code='ILS', numeric='376', name='New Israeli Sheqel', countries=['ISRAEL'])
-CURRENCY['HUF'] = Currency(code='HUF', numeric='348', name='Forint', countries=['HUNGARY'])
-CURRENCY['UAH'] = Currency(code='UAH', numeric='980', name='Hryvnia', countries=['UKRAINE'])
-CURRENCY['RUB'] = Currency(code='RUB', numeric='643', name='Russian Ruble', countries=['RUSSIAN FEDERATION'])
-CURRENCY['IRR'] = Currency(code='IRR', numeric='364', name='Iranian Rial', countries=['IRAN'])
-CURRENCY['BMD'] = Currency(code='BMD', numeric='060', name='Bermudian Dollar (customarily known as Bermuda Dollar)', countries=['BERMUDA'])
-CURRENCY['MGA'] = Currency(code='MGA', numeric='969', name='Malagasy Ariary', countries=['MADAGASCAR'])
-CURRENCY['MVR'] = Currency(code='MVR', numeric='462', name='Rufiyaa', countries=['MALDIVES'])
-CURRENCY['QAR'] = Currency(code='QAR', numeric='634', name='Qatari Rial', countries=['QATAR'])
-CURRENCY['VND'] = Currency(code='VND', numeric='704', name='Dong', countries=['VIET NAM'])
-CURRENCY['MRO'] = Currency(code='MRO', numeric='478', name='Ouguiya', countries=['MAURITANIA'])
-CURRENCY['NPR'] = Currency(code='NPR', numeric='524', name='Nepalese Rupee', countries=['NEPAL'])
-CURRENCY['TZS'] = Currency(code='TZS', numeric='834', name='Tanzanian Shilling', countries=['TANZANIA'])
-CURRENCY['BIF'] = Currency(code='BIF', numeric='108', name='Burundi Franc', countries=['BURUNDI'])
-CURRENCY['XPT'] = Currency(code='XPT', numeric='962', name='Platinum', countries=[])
-CURRENCY['KHR'] = Currency(code='KHR', numeric='116', name='Riel', countries=['CAMBODIA'])
-CURRENCY['SYP'] = Currency(code='SYP', numeric='760', name='Syrian Pound', countries=['SYRIAN ARAB REPUBLIC'])
-CURRENCY['BHD'] = Currency(code='BHD', numeric='048', name='Bahraini Dinar', countries=['BAHRAIN'])
-CURRENCY['XDR'] = Currency(code='XDR', numeric='960', name='SDR', countries=['INTERNATIONAL MONETARY FUND (I.M.F)'])
-CURRENCY['STD'] = Currency(code='STD', numeric='678', name='Dobra', countries=['SAO TOME AND PRINCIPE'])
-CURRENCY['BAM'] = Currency(code='BAM', numeric='977', name='Convertible Marks', countries=['BOSNIA AND HERZEGOVINA'])
-CURRENCY['LTL'] = Currency(code='LTL', numeric='440', name='Lithuanian Litas', countries=['LITHUANIA'])
-CURRENCY['ETB'] = Currency(code='ETB', numeric='230', name='Ethiopian Birr', countries=['ETHIOPIA'])
-CURRENCY['XPF'] = Currency(code='XPF', numeric='953', name='CFP Franc', countries=['FRENCH POLYNESIA', 'NEW CALEDONIA', 'WALLIS AND FUTUNA'])
+ISO_4217 = (
+    ('BZD', '084', 'Belize Dollar', ('BELIZE',), 2),
+    ('YER', '886', 'Yemeni Rial', ('YEMEN',), 2),
+    ('XBA', '955', 'Bond Markets Units European Composite Unit (EURCO)', (), 2),
+    ('SLL', '694', 'Leone', ('SIERRA LEONE',), 2),
+    ('ERN', '232', 'Nakfa', ('ERITREA',), 2),
+    ('NGN', '566', 'Naira', ('NIGERIA',), 2),
+    ('CRC', '188', 'Costa Rican Colon', ('COSTA RICA',), 2),
+    ('VEF', '937', 'Bolivar Fuerte', ('VENEZUELA',), 2),
+    ('LAK', '418', 'Kip', ('LAO PEOPLES DEMOCRATIC REPUBLIC',), 2),
+    ('DZD', '012', 'Algerian Dinar', ('ALGERIA',), 2),
+    ('SZL', '748', 'Lilangeni', ('SWAZILAND',), 2),
+    ('MOP', '446', 'Pataca', ('MACAO',), 2),
+    ('BYR', '974', 'Belarussian Ruble', ('BELARUS',), 0),
+    ('MUR', '480', 'Mauritius Rupee', ('MAURITIUS',), 2),
+    ('WST', '882', 'Tala', ('SAMOA',), 2),
+    ('LRD', '430', 'Liberian Dollar', ('LIBERIA',), 2),
+    ('MMK', '104', 'Kyat', ('MYANMAR',), 2),
+    ('KGS', '417', 'Som', ('KYRGYZSTAN',), 2),
+    ('PYG', '600', 'Guarani', ('PARAGUAY',), 0),
+    ('IDR', '360', 'Rupiah', ('INDONESIA',), 2),
+    ('XBD', '958', 'European Unit of Account 17(E.U.A.-17)', (), 2),
+    ('GTQ', '320', 'Quetzal', ('GUATEMALA',), 2),
+    ('CAD', '124', 'Canadian Dollar', ('CANADA',), 2),
+    ('AWG', '533', 'Aruban Guilder', ('ARUBA',), 2),
+    ('TTD', '780', 'Trinidad and Tobago Dollar', ('TRINIDAD AND TOBAGO',), 2),
+    ('PKR', '586', 'Pakistan Rupee', ('PAKISTAN',), 2),
+    ('XBC', '957', 'European Unit of Account 9(E.U.A.-9)', (), 2),
+    ('UZS', '860', 'Uzbekistan Sum', ('UZBEKISTAN',), 2),
+    ('XCD', '951', 'East Caribbean Dollar', ('ANGUILLA', 'ANTIGUA AND BARBUDA', 'DOMINICA', 'GRENADA', 'MONTSERRAT', 'SAINT KITTS AND NEVIS', 'SAINT LUCIA', 'SAINT VINCENT AND THE GRENADINES'), 2),
+    ('VUV', '548', 'Vatu', ('VANUATU',), 0),
+    ('KMF', '174', 'Comoro Franc', ('COMOROS',), 0),
+    ('AZN', '944', 'Azerbaijanian Manat', ('AZERBAIJAN',), 2),
+    ('XPD', '964', 'Palladium', (), 2),
+    ('MNT', '496', 'Tugrik', ('MONGOLIA',), 2),
+    ('ANG', '532', 'Netherlands Antillian Guilder', ('NETHERLANDS ANTILLES',), 2),
+    ('LBP', '422', 'Lebanese Pound', ('LEBANON',), 2),
+    ('KES', '404', 'Kenyan Shilling', ('KENYA',), 2),
+    ('GBP', '826', 'Pound Sterling', ('UNITED KINGDOM',), 2),
+    ('SEK', '752', 'Swedish Krona', ('SWEDEN',), 2),
+    ('AFN', '971', 'Afghani', ('AFGHANISTAN',), 2),
+    ('KZT', '398', 'Tenge', ('KAZAKHSTAN',), 2),
+    ('ZMK', '894', 'Kwacha', ('ZAMBIA',), 2),
+    ('SKK', '703', 'Slovak Koruna', ('SLOVAKIA',), 2),
+    ('DKK', '208', 'Danish Krone', ('DENMARK', 'FAROE ISLANDS', 'GREENLAND'), 2),
+    ('TMM', '795', 'Manat', ('TURKMENISTAN',), 2),
+    ('AMD', '051', 'Armenian Dram', ('ARMENIA',), 2),
+    ('SCR', '690', 'Seychelles Rupee', ('SEYCHELLES',), 2),
+    ('FJD', '242', 'Fiji Dollar', ('FIJI',), 2),
+    ('SHP', '654', 'Saint Helena Pound', ('SAINT HELENA',), 2),
+    ('ALL', '008', 'Lek', ('ALBANIA',), 2),
+    ('TOP', '776', 'Paanga', ('TONGA',), 2),
+    ('UGX', '800', 'Uganda Shilling', ('UGANDA',), 0),
+    ('OMR', '512', 'Rial Omani', ('OMAN',), 3),
+    ('DJF', '262', 'Djibouti Franc', ('DJIBOUTI',), 0),
+    ('BND', '096', 'Brunei Dollar', ('BRUNEI DARUSSALAM',), 2),
+    ('TND', '788', 'Tunisian Dinar', ('TUNISIA',), 3),
+    ('SBD', '090', 'Solomon Islands Dollar', ('SOLOMON ISLANDS',), 2),
+    ('GHS', '936', 'Ghana Cedi', ('GHANA',), 2),
+    ('GNF', '324', 'Guinea Franc', ('GUINEA',), 0),
+    ('CVE', '132', 'Cape Verde Escudo', ('CAPE VERDE',), 2),
+    ('ARS', '032', 'Argentine Peso', ('ARGENTINA',), 2),
+    ('GMD', '270', 'Dalasi', ('GAMBIA',), 2),
+    ('ZWD', '716', 'Zimbabwe Dollar', ('ZIMBABWE',), 2),
+    ('MWK', '454', 'Kwacha', ('MALAWI',), 2),
+    ('BDT', '050', 'Taka', ('BANGLADESH',), 2),
+    ('KWD', '414', 'Kuwaiti Dinar', ('KUWAIT',), 3),
+    ('EUR', '978', 'Euro', ('ANDORRA', 'AUSTRIA', 'BELGIUM', 'FINLAND', 'FRANCE', 'FRENCH GUIANA', 'FRENCH SOUTHERN TERRITORIES', 'GERMANY', 'GREECE', 'GUADELOUPE', 'IRELAND', 'ITALY', 'LUXEMBOURG', 'MARTINIQUE', 'MAYOTTE', 'MONACO', 'MONTENEGRO', 'NETHERLANDS', 'PORTUGAL', 'R.UNION', 'SAINT PIERRE AND MIQUELON', 'SAN MARINO', 'SLOVENIA', 'SPAIN'), 2),
+    ('CHF', '756', 'Swiss Franc', ('LIECHTENSTEIN',), 2),
+    ('XAG', '961', 'Silver', (), 2),
+    ('SRD', '968', 'Surinam Dollar', ('SURINAME',), 2),
+    ('DOP', '214', 'Dominican Peso', ('DOMINICAN REPUBLIC',), 2),
+    ('PEN', '604', 'Nuevo Sol', ('PERU',), 2),
+    ('KPW', '408', 'North Korean Won', ('KOREA',), 2),
+    ('SGD', '702', 'Singapore Dollar', ('SINGAPORE',), 2),
+    ('TWD', '901', 'New Taiwan Dollar', ('TAIWAN',), 2),
+    ('USD', '840', 'US Dollar', ('AMERICAN SAMOA', 'BRITISH INDIAN OCEAN TERRITORY', 'ECUADOR', 'GUAM', 'MARSHALL ISLANDS', 'MICRONESIA', 'NORTHERN MARIANA ISLANDS', 'PALAU', 'PUERTO RICO', 'TIMOR-LESTE', 'TURKS AND CAICOS ISLANDS', 'UNITED STATES MINOR OUTLYING ISLANDS', 'VIRGIN ISLANDS (BRITISH)', 'VIRGIN ISLANDS (U.S.)'), 2),
+    ('BGN', '975', 'Bulgarian Lev', ('BULGARIA',), 2),
+    ('MAD', '504', 'Moroccan Dirham', ('MOROCCO', 'WESTERN SAHARA'), 2),
+    ('XXX', '999', 'The codes assigned for transactions where no currency is involved are:', (), 2),
+    ('SAR', '682', 'Saudi Riyal', ('SAUDI ARABIA',), 2),
+    ('AUD', '036', 'Australian Dollar', ('AUSTRALIA', 'CHRISTMAS ISLAND', 'COCOS (KEELING) ISLANDS', 'HEARD ISLAND AND MCDONALD ISLANDS', 'KIRIBATI', 'NAURU', 'NORFOLK ISLAND', 'TUVALU'), 2),
+    ('KYD', '136', 'Cayman Islands Dollar', ('CAYMAN ISLANDS',), 2),
+    ('KRW', '410', 'Won', ('KOREA',), 0),
+    ('GIP', '292', 'Gibraltar Pound', ('GIBRALTAR',), 2),
+    ('TRY', '949', 'New Turkish Lira', ('TURKEY',), 2),
+    ('XAU', '959', 'Gold', (), 2),
+    ('CZK', '203', 'Czech Koruna', ('CZECH REPUBLIC',), 2),
+    ('JMD', '388', 'Jamaican Dollar', ('JAMAICA',), 2),
+    ('BSD', '044', 'Bahamian Dollar', ('BAHAMAS',), 2),
+    ('BWP', '072', 'Pula', ('BOTSWANA',), 2),
+    ('GYD', '328', 'Guyana Dollar', ('GUYANA',), 2),
+    ('XTS', '963', 'Codes specifically reserved for testing purposes', (), 2),
+    ('LYD', '434', 'Libyan Dinar', ('LIBYAN ARAB JAMAHIRIYA',), 3),
+    ('EGP', '818', 'Egyptian Pound', ('EGYPT',), 2),
+    ('THB', '764', 'Baht', ('THAILAND',), 2),
+    ('MKD', '807', 'Denar', ('MACEDONIA',), 2),
+    ('SDG', '938', 'Sudanese Pound', ('SUDAN',), 2),
+    ('AED', '784', 'UAE Dirham', ('UNITED ARAB EMIRATES',), 2),
+    ('JOD', '400', 'Jordanian Dinar', ('JORDAN',), 3),
+    ('JPY', '392', 'Yen', ('JAPAN',), 0),
+    ('ZAR', '710', 'Rand', ('SOUTH AFRICA',), 2),
+    ('HRK', '191', 'Croatian Kuna', ('CROATIA',), 2),
+    ('AOA', '973', 'Kwanza', ('ANGOLA',), 2),
+    ('RWF', '646', 'Rwanda Franc', ('RWANDA',), 0),
+    ('CUP', '192', 'Cuban Peso', ('CUBA',), 2),
+    ('XFO', 'Nil', 'Gold-Franc', (), 2),
+    ('BBD', '052', 'Barbados Dollar', ('BARBADOS',), 2),
+    ('PGK', '598', 'Kina', ('PAPUA NEW GUINEA',), 2),
+    ('LKR', '144', 'Sri Lanka Rupee', ('SRI LANKA',), 2),
+    ('RON', '946', 'New Leu', ('ROMANIA',), 2),
+    ('PLN', '985', 'Zloty', ('POLAND',), 2),
+    ('IQD', '368', 'Iraqi Dinar', ('IRAQ',), 3),
+    ('TJS', '972', 'Somoni', ('TAJIKISTAN',), 2),
+    ('MDL', '498', 'Moldovan Leu', ('MOLDOVA',), 2),
+    ('MYR', '458', 'Malaysian Ringgit', ('MALAYSIA',), 2),
+    ('CNY', '156', 'Yuan Renminbi', ('CHINA',), 2),
+    ('LVL', '428', 'Latvian Lats', ('LATVIA',), 2),
+    ('INR', '356', 'Indian Rupee', ('INDIA',), 2),
+    ('FKP', '238', 'Falkland Islands Pound', ('FALKLAND ISLANDS (MALVINAS)',), 2),
+    ('NIO', '558', 'Cordoba Oro', ('NICARAGUA',), 2),
+    ('PHP', '608', 'Philippine Peso', ('PHILIPPINES',), 2),
+    ('HNL', '340', 'Lempira', ('HONDURAS',), 2),
+    ('HKD', '344', 'Hong Kong Dollar', ('HONG KONG',), 2),
+    ('NZD', '554', 'New Zealand Dollar', ('COOK ISLANDS', 'NEW ZEALAND', 'NIUE', 'PITCAIRN', 'TOKELAU'), 2),
+    ('BRL', '986', 'Brazilian Real', ('BRAZIL',), 2),
+    ('RSD', '941', 'Serbian Dinar', ('SERBIA',), 2),
+    ('XBB', '956', 'European Monetary Unit (E.M.U.-6)', (), 2),
+    ('EEK', '233', 'Kroon', ('ESTONIA',), 2),
+    ('SOS', '706', 'Somali Shilling', ('SOMALIA',), 2),
+    ('MZN', '943', 'Metical', ('MOZAMBIQUE',), 2),
+    ('XFU', 'Nil', 'UIC-Franc', (), 2),
+    ('NOK', '578', 'Norwegian Krone', ('BOUVET ISLAND', 'NORWAY', 'SVALBARD AND JAN MAYEN'), 2),
+    ('ISK', '352', 'Iceland Krona', ('ICELAND',), 0),
+    ('GEL', '981', 'Lari', ('GEORGIA',), 2),
+    ('ILS', '376', 'New Israeli Sheqel', ('ISRAEL',), 2),
+    ('HUF', '348', 'Forint', ('HUNGARY',), 2),
+    ('UAH', '980', 'Hryvnia', ('UKRAINE',), 2),
+    ('RUB', '643', 'Russian Ruble', ('RUSSIAN FEDERATION',), 2),
+    ('IRR', '364', 'Iranian Rial', ('IRAN',), 2),
+    ('BMD', '060', 'Bermudian Dollar (customarily known as Bermuda Dollar)', ('BERMUDA',), 2),
+    ('MGA', '969', 'Malagasy Ariary', ('MADAGASCAR',), 2),
+    ('MVR', '462', 'Rufiyaa', ('MALDIVES',), 2),
+    ('QAR', '634', 'Qatari Rial', ('QATAR',), 2),
+    ('VND', '704', 'Dong', ('VIET NAM',), 0),
+    ('MRO', '478', 'Ouguiya', ('MAURITANIA',), 2),
+    ('NPR', '524', 'Nepalese Rupee', ('NEPAL',), 2),
+    ('TZS', '834', 'Tanzanian Shilling', ('TANZANIA',), 2),
+    ('BIF', '108', 'Burundi Franc', ('BURUNDI',), 0),
+    ('XPT', '962', 'Platinum', (), 2),
+    ('KHR', '116', 'Riel', ('CAMBODIA',), 2),
+    ('SYP', '760', 'Syrian Pound', ('SYRIAN ARAB REPUBLIC',), 2),
+    ('BHD', '048', 'Bahraini Dinar', ('BAHRAIN',), 3),
+    ('XDR', '960', 'SDR', ('INTERNATIONAL MONETARY FUND (I.M.F)',), 2),
+    ('STD', '678', 'Dobra', ('SAO TOME AND PRINCIPE',), 2),
+    ('BAM', '977', 'Convertible Marks', ('BOSNIA AND HERZEGOVINA',), 2),
+    ('LTL', '440', 'Lithuanian Litas', ('LITHUANIA',), 2),
+    ('ETB', '230', 'Ethiopian Birr', ('ETHIOPIA',), 2),
+    ('XPF', '953', 'CFP Franc', ('FRENCH POLYNESIA', 'NEW CALEDONIA', 'WALLIS AND FUTUNA'), 0),
+)
+
+_TABLE = None
+_TABLE_LOCK = threading.Lock()
+
+def currency_table():
+    """
+    Returns the CurrencySource of the ISO_4217 currencies, which is built
+    the first time it is asked for.  It is also the module attribute
+    CURRENCY, and the currency provider until another one is set.
+    """
+    global _TABLE
+    table = _TABLE
+    if table is None:
+        with _TABLE_LOCK:
+            if _TABLE is None:
+                _TABLE = CurrencySource((code, Currency(code, numeric, name, list(countries), exponent))
+                                        for code, numeric, name, countries, exponent in ISO_4217)
+            table = _TABLE
+    return table
+
+#
+# Currency symbols, used when parsing and formatting amounts
+#
+
+SYMBOLS = {
+    'USD': u'$',
+    'EUR': u'\u20ac',
+    'GBP': u'\xa3',
+    'JPY': u'\xa5',
+    'CNY': u'\xa5',
+    'KRW': u'\u20a9',
+    'ILS': u'\u20aa',
+    'INR': u'\u20b9',
+    'NGN': u'\u20a6',
+    'PHP': u'\u20b1',
+    'UAH': u'\u20b4',
+    'VND': u'\u20ab',
+    'THB': u'\u0e3f',
+    'CRC': u'\u20a1',
+    'PYG': u'\u20b2',
+    'LAK': u'\u20ad',
+    'MNT': u'\u20ae',
+}
+
+class _CurrenciesModule(types.ModuleType):
+    """
+    This module, with CURRENCY built when it is first read rather than at
+    import.
+    """
+
+    def __init__(self, module):
+        types.ModuleType.__init__(self, module.__name__, module.__doc__)
+        self.__dict__.update(module.__dict__)
+        # the module's functions use its globals, which Python clears when
+        # the module object goes away
+        self._module = module
+
+    CURRENCY = property(lambda self: currency_table())
+
+sys.modules[__name__] = _CurrenciesModule(sys.modules[__name__])
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Locale-aware formatting of monetary amounts.
+
+Patterns follow a small subset of the Unicode CLDR number pattern syntax:
+``¤`` stands for the currency symbol, ``¤¤`` for the ISO code, ``#,##0.00``
+for the number (a ``,`` turns grouping on), and an optional ``;``
+introduces the pattern for negative amounts.  The number of decimals
+always comes from the currency's minor unit, not from the pattern.
+
+>>> from money import Money
+>>> format_money(Money("1234.5", "USD"))
+u'$1,234.50'
+>>> format_money(Money("1234.5", "EUR"), "de_DE")
+u'1.234,50\\xa0\\u20ac'
+>>> format_money(Money(-1234, "JPY"), "en_US", u"\\xa4\\xa4 #,##0")
+u'-JPY 1,234'
+"""
+import re
+from decimal import Decimal, ROUND_HALF_EVEN
+
+from money.Money import BaseCurrency, _quantizer, _resolve_currency, _LRUCache
+from money.currencies import SYMBOLS
+
+__all__ = ('LOCALES', 'MoneyFormat', 'get_format', 'format_money', 'format_many')
+
+# locale -> (decimal point, grouping separator, default pattern)
+LOCALES = {
+    'en_US': (u'.', u',', u'\xa4#,##0.00'),
+    'en_GB': (u'.', u',', u'\xa4#,##0.00'),
+    'ja_JP': (u'.', u',', u'\xa4#,##0'),
+    'de_DE': (u',', u'.', u'#,##0.00\xa0\xa4'),
+    'de_CH': (u'.', u"'", u'\xa4\xa0#,##0.00'),
+    'fr_FR': (u',', u'\xa0', u'#,##0.00\xa0\xa4'),
+    'es_ES': (u',', u'.', u'#,##0.00\xa0\xa4'),
+    'it_IT': (u',', u'.', u'#,##0.00\xa0\xa4'),
+    'nl_NL': (u',', u'.', u'\xa4\xa0#,##0.00'),
+}
+
+_NUMBER = re.compile(u'[#0,.]+')
+
+class MoneyFormat(object):
+    """
+    A pattern compiled for one currency and locale.  Everything that can
+    be worked out ahead of the amount (affixes, separators, decimals) is
+    worked out once, in the constructor.
+    """
+
+    def __init__(self, currency, locale='en_US', pattern=None, rounding=ROUND_HALF_EVEN):
+        decimal_point, grouping, default_pattern = LOCALES[locale]
+        if pattern is None:
+            pattern = default_pattern
+        if u';' in pattern:
+            positive, negative = pattern.split(u';', 1)
+        else:
+            positive, negative = pattern, u'-' + pattern
+        code = currency.code
+        symbol = SYMBOLS.get(code, code)
+        self.positive = self._affixes(positive, code, symbol)
+        self.negative = self._affixes(negative, code, symbol)
+        self.grouping = u',' in _NUMBER.search(positive).group()
+        self.decimal_point = decimal_point
+        self.grouping_separator = grouping
+        self.quantum, self.context = _quantizer(currency.exponent, rounding)
+        self._spec = self.grouping and ',f' or 'f'
+        self._translate = (decimal_point, grouping) != (u'.', u',')
+
+    def _affixes(self, pattern, code, symbol):
+        number = _NUMBER.search(pattern)
+        if number is None:
+            raise ValueError, 'invalid money pattern: %r' % pattern
+        prefix, suffix = pattern[:number.start()], pattern[number.end():]
+        return (prefix.replace(u'\xa4\xa4', code).replace(u'\xa4', symbol),
+                suffix.replace(u'\xa4\xa4', code).replace(u'\xa4', symbol))
+
+    def format(self, amount):
+        """
+        Formats a Decimal amount in the currency of this format.
+        """
+        amount = amount.quantize(self.quantum, context=self.context)
+        if amount < 0:
+            prefix, suffix = self.negative
+        else:
+            prefix, suffix = self.positive
+        number = unicode(format(amount.copy_abs(), self._spec))
+        if self._translate:
+            number = number.replace(u',', u'\0').replace(u'.', self.decimal_point) \
+                           .replace(u'\0', self.grouping_separator)
+        return prefix + number + suffix
+
+# most recently used formats, keyed by currency code and exponent,
+# locale, pattern and rounding
+_FORMATS = _LRUCache(1024)
+
+def get_format(currency, locale='en_US', pattern=None, rounding=ROUND_HALF_EVEN):
+    """
+    Returns the compiled MoneyFormat for a currency, locale and pattern,
+    compiling it on first use.
+    """
+    if not isinstance(currency, BaseCurrency):
+        currency = _resolve_currency(currency)
+    key = (currency.code, currency.exponent, locale, pattern, rounding)
+    money_format = _FORMATS.get(key)
+    if money_format is None:
+        money_format = MoneyFormat(currency, locale, pattern, rounding)
+        _FORMATS.put(key, money_format)
+    return money_format
+
+def format_money(money, locale='en_US', pattern=None, rounding=ROUND_HALF_EVEN):
+    """
+    Formats one Money according to ``locale`` and, optionally, ``pattern``.
+    """
+    return get_format(money.currency, locale, pattern, rounding).format(money.amount)
+
+def format_many(values, locale='en_US', pattern=None, currency=None, rounding=ROUND_HALF_EVEN):
+    """
+    Formats a column of values, returning a list of strings.  The values are
+    Money, or plain amounts in ``currency`` when that is given.  Formats
+    are looked up once per currency, not once per value.
+    """
+    if currency is not None:
+        money_format = get_format(currency, locale, pattern, rounding).format
+        return [money_format(value if isinstance(value, Decimal) else Decimal(value))
+                for value in values]
+    formats = {}
+    results = []
+    for money in values:
+        code = money.currency.code
+        money_format = formats.get(code)
+        if money_format is None:
+            money_format = formats[code] = get_format(money.currency, locale, pattern, rounding).format
+        results.append(money_format(money.amount))
+    return results
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Optional counters and timers for the hot paths of the money package.
+
+While enabled, these events are recorded:
+
+``lookup``
+    a currency looked up in the currency provider, by code or as the
+    default currency.  With the Django CurrencyManager as provider every
+    lookup is a database query.
+``convert``
+    a call of Money.convert_to or Money.convert_to_default.
+``parse_error``
+    a Money.from_string call that raised IncorrectMoneyInputError.
+``create``
+    a Money (or subclass) constructed through its constructor.
+``allocate``
+    a call of Money.allocate or Money.allocate_many.
+
+For each event snapshot() reports how many times it happened and the time
+spent in it, in seconds.  Callbacks registered with add_hook are called
+with the event name and elapsed time as each event happens, which is how
+the numbers are forwarded to a metrics system::
+
+    from money import instrumentation
+    instrumentation.add_hook(lambda event, elapsed: statsd.timing('money.' + event, elapsed))
+    instrumentation.enable()
+
+Enabling replaces the instrumented methods with wrappers, and disabling
+puts the originals back, so a disabled instrumentation costs nothing.
+"""
+import threading
+import time
+
+from money.Money import Money, IntegerMoney, IncorrectMoneyInputError, _set_provider_wrapper
+
+__all__ = ('EVENTS', 'enable', 'disable', 'enabled', 'snapshot', 'reset',
+           'add_hook', 'remove_hook')
+
+EVENTS = ('lookup', 'convert', 'parse_error', 'create', 'allocate')
+
+_LOCK = threading.Lock()
+_COUNTS = dict((event, [0, 0.0]) for event in EVENTS)
+_HOOKS = []
+_ORIGINALS = {}
+
+def _record(event, elapsed):
+    with _LOCK:
+        counter = _COUNTS[event]
+        counter[0] += 1
+        counter[1] += elapsed
+    for hook in _HOOKS:
+        hook(event, elapsed)
+
+class CountingProvider(object):
+    """
+    Wraps a currency provider, recording a ``lookup`` event for every
+    currency it is asked for.  Everything else is passed through.
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def __getitem__(self, code):
+        start = time.time()
+        try:
+            return self.provider[code]
+        finally:
+            _record('lookup', time.time() - start)
+
+    def get_default(self):
+        start = time.time()
+        try:
+            return self.provider.get_default()
+        finally:
+            _record('lookup', time.time() - start)
+
+    def __contains__(self, code):
+        return code in self.provider
+
+    def __iter__(self):
+        return iter(self.provider)
+
+    def __len__(self):
+        return len(self.provider)
+
+    def __getattr__(self, name):
+        return getattr(self.provider, name)
+
+def _timed(event, function):
+    def timed(*args, **kwargs):
+        start = time.time()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _record(event, time.time() - start)
+    timed.__name__ = function.__name__
+    timed.__doc__ = function.__doc__
+    return timed
+
+def _parse_errors(function):
+    def from_string(cls, s):
+        start = time.time()
+        try:
+            return function(cls, s)
+        except IncorrectMoneyInputError:
+            _record('parse_error', time.time() - start)
+            raise
+    from_string.__doc__ = function.__doc__
+    return from_string
+
+def _patches():
+    """
+    Yields (class, attribute, wrapper) for every method to instrument.
+    """
+    for cls in (Money, IntegerMoney):
+        yield cls, '__init__', _timed('create', cls.__dict__['__init__'])
+    for name in ('convert_to', 'convert_to_default'):
+        yield Money, name, _timed('convert', Money.__dict__[name])
+    # allocate() goes through allocate_many()
+    allocate_many = Money.__dict__['allocate_many'].__func__
+    yield Money, 'allocate_many', classmethod(_timed('allocate', allocate_many))
+    from_string = Money.__dict__['from_string'].__func__
+    yield Money, 'from_string', classmethod(_parse_errors(from_string))
+
+def enabled():
+    return bool(_ORIGINALS)
+
+def enable():
+    """
+    Starts recording events.
+    """
+    with _LOCK:
+        if _ORIGINALS:
+            return
+        for cls, name, wrapper in _patches():
+            _ORIGINALS[cls, name] = cls.__dict__[name]
+            setattr(cls, name, wrapper)
+    _set_provider_wrapper(CountingProvider)
+
+def disable():
+    """
+    Stops recording events, restoring the uninstrumented methods.  The
+    counts so far are kept.
+    """
+    _set_provider_wrapper(None)
+    with _LOCK:
+        for (cls, name), original in _ORIGINALS.items():
+            setattr(cls, name, original)
+        _ORIGINALS.clear()
+
+def snapshot():
+    """
+    Returns {event: {'count': n, 'time': seconds}} for every event.
+    """
+    with _LOCK:
+        return dict((event, {'count': count, 'time': elapsed})
+                    for event, (count, elapsed) in _COUNTS.iteritems())
+
+def reset():
+    """
+    Sets every count and time back to zero.
+    """
+    with _LOCK:
+        for counter in _COUNTS.itervalues():
+            counter[:] = [0, 0.0]
+
+def add_hook(callback):
+    """
+    Calls ``callback(event, elapsed)`` for every event recorded from now on.
+    """
+    _HOOKS.append(callback)
+
+def remove_hook(callback):
+    _HOOKS.remove(callback)
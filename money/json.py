@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+JSON support for Money.
+
+Money is written as ``{"amount": "12.50", "currency": "EUR"}``, with the
+amount as a string so that no precision is lost to floats.
+
+>>> dumps({"price": Money("12.50", "EUR")}, sort_keys=True)
+'{"price": {"amount": "12.50", "currency": "EUR"}}'
+>>> loads('{"amount": "12.50", "currency": "EUR"}')
+EUR 12.50
+
+Long arrays of Money can be written chunk by chunk with iterencode_many or
+dump_many, and read back one value at a time with iter_decode, so that
+neither side needs the whole document in memory.
+"""
+from __future__ import absolute_import
+
+import json
+import re
+from decimal import Decimal
+
+from money.Money import Money, currency_provider
+
+__all__ = ('MoneyJSONEncoder', 'MoneyObjectHook', 'object_hook', 'dumps', 'loads',
+           'iterencode_many', 'dump_many', 'iter_decode')
+
+class MoneyJSONEncoder(json.JSONEncoder):
+    """
+    A JSONEncoder that writes Money as an amount and currency object, and
+    Decimal as a string.
+    """
+
+    def default(self, o):
+        if isinstance(o, Money):
+            return {'amount': str(o.amount), 'currency': o.currency.code}
+        if isinstance(o, Decimal):
+            return str(o)
+        return json.JSONEncoder.default(self, o)
+
+class MoneyObjectHook(object):
+    """
+    An ``object_hook`` that turns ``{"amount": ..., "currency": ...}``
+    objects into ``money_class`` instances and leaves other objects alone.
+    Currencies are looked up once per code for as long as the current
+    provider stays the same.  The hook may be shared by threads using
+    different providers: the cache and the provider it belongs to are
+    replaced together, and each call only uses the pair it read.
+    """
+
+    def __init__(self, money_class=Money):
+        self.money_class = money_class
+        self._cache = (None, {})
+
+    def currency(self, code):
+        provider = currency_provider()
+        cached, currencies = self._cache
+        if cached is not provider:
+            currencies = {}
+            self._cache = (provider, currencies)
+        try:
+            return currencies[code]
+        except KeyError:
+            currency = currencies[code] = provider[code]
+            return currency
+
+    def __call__(self, obj):
+        if len(obj) != 2 or 'amount' not in obj or 'currency' not in obj:
+            return obj
+        amount = obj['amount']
+        if isinstance(amount, float):
+            amount = Decimal(repr(amount))
+        elif not isinstance(amount, Decimal):
+            amount = Decimal(amount)
+        return self.money_class(amount, self.currency(obj['currency']))
+
+object_hook = MoneyObjectHook()
+
+def dumps(obj, **kwargs):
+    """
+    json.dumps with Money support.
+    """
+    kwargs.setdefault('cls', MoneyJSONEncoder)
+    return json.dumps(obj, **kwargs)
+
+def loads(s, money_class=Money, **kwargs):
+    """
+    json.loads that decodes Money objects, and numbers with a fraction as
+    Decimal.
+    """
+    kwargs.setdefault('parse_float', Decimal)
+    if money_class is Money:
+        kwargs.setdefault('object_hook', object_hook)
+    else:
+        kwargs.setdefault('object_hook', MoneyObjectHook(money_class))
+    return json.loads(s, **kwargs)
+
+def iterencode_many(moneys, chunk_size=1000):
+    """
+    Encodes an iterable of Money as a JSON array, yielding the text in
+    chunks of ``chunk_size`` values.  The iterable is consumed lazily.  Each
+    value is formatted directly rather than through a dict and the generic
+    encoder, with the currency part prepared once per currency.
+    """
+    suffixes = {}
+    chunk = []
+    separator = '['
+    for money in moneys:
+        currency = money.currency
+        suffix = suffixes.get(currency.code)
+        if suffix is None:
+            suffix = suffixes[currency.code] = '", "currency": %s}' % json.dumps(currency.code)
+        chunk.append('{"amount": "%s%s' % (money.amount, suffix))
+        if len(chunk) == chunk_size:
+            yield separator + ', '.join(chunk)
+            separator = ', '
+            chunk = []
+    if chunk:
+        yield separator + ', '.join(chunk)
+        separator = ', '
+    yield separator == '[' and '[]' or ']'
+
+def dump_many(moneys, fp, chunk_size=1000):
+    """
+    Writes an iterable of Money to the file ``fp`` as a JSON array, one
+    chunk at a time.
+    """
+    for chunk in iterencode_many(moneys, chunk_size):
+        fp.write(chunk)
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def _chunks(source, size):
+    if hasattr(source, 'read'):
+        return iter(lambda: source.read(size), '')
+    return iter(source)
+
+# states of iter_decode
+_START, _FIRST, _VALUE, _SEPARATOR = range(4)
+
+def iter_decode(source, money_class=Money, chunk_size=65536):
+    """
+    Lazily decodes a top-level JSON array, read from a file object or an
+    iterable of strings, yielding its values one at a time.  Money objects
+    are decoded as ``money_class``; only the value being decoded and the
+    unread part of the current chunk are held in memory.
+    """
+    if money_class is Money:
+        hook = object_hook
+    else:
+        hook = MoneyObjectHook(money_class)
+    raw_decode = json.JSONDecoder(object_hook=hook, parse_float=Decimal).raw_decode
+    skip = _WHITESPACE.match
+    chunks = _chunks(source, chunk_size)
+    buffer = ''
+    position = 0
+    state = _START
+    exhausted = False
+    while True:
+        position = skip(buffer, position).end()
+        if position < len(buffer):
+            char = buffer[position]
+            if state == _START:
+                if char != '[':
+                    raise ValueError, 'expected a JSON array'
+                state = _FIRST
+                position += 1
+                continue
+            if char == ']' and state != _VALUE:
+                return
+            if state == _SEPARATOR:
+                if char != ',':
+                    raise ValueError, 'expected , or ] at %r' % buffer[position:position + 20]
+                state = _VALUE
+                position += 1
+                continue
+            try:
+                value, end = raw_decode(buffer, position)
+            except ValueError:
+                if exhausted:
+                    raise
+            else:
+                # a value that runs to the end of the buffer may be a number
+                # cut short by the chunking
+                if end < len(buffer) or exhausted:
+                    yield value
+                    position = end
+                    state = _SEPARATOR
+                    continue
+        if exhausted:
+            raise ValueError, 'unterminated JSON array'
+        buffer = buffer[position:]
+        position = 0
+        try:
+            buffer += next(chunks)
+        except StopIteration:
+            exhausted = True
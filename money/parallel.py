@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Sums, conversions and allocations of large batches of Money on a pool of
+worker processes.
+
+The input is cut into chunks of ``chunk_size`` values.  Each chunk is sent
+to the workers in the compact form of money.codec, with an index into the
+batch's list of currencies in place of the numeric code, so workers never
+need a currency provider.  Partial results are
+merged exactly in the calling process, and the results are the same as
+those of the serial operations: MoneyBag for sums, Money.convert_to and
+Money.allocate_many.  (Sums are exact integers throughout, so where a
+serial sum would exceed the Decimal precision and be rounded, the parallel
+one is still exact.)
+
+``processes`` is the number of workers (the number of CPUs by default);
+with ``processes=0`` the chunks are processed in the calling process, which
+is useful for debugging.  A ``multiprocessing.Pool`` may be passed as
+``pool`` to reuse it across calls.
+"""
+import multiprocessing
+import struct
+from decimal import Decimal, getcontext, localcontext
+from itertools import imap, islice, izip
+
+from money.Money import Money, IntegerMoney, rate_table, _allocate_units, _integer_ratios, \
+    _integer_money
+from money.bag import MoneyBag
+from money.codec import _RECORD, _units
+
+__all__ = ('parallel_sum', 'parallel_convert', 'parallel_allocate', 'CHUNK_SIZE')
+
+CHUNK_SIZE = 10000
+
+class _Encoder(object):
+    """
+    Packs chunks of Money, numbering their currencies as they come.
+    """
+
+    def __init__(self):
+        self.currencies = []
+        self._indexes = {}
+
+    def index(self, currency):
+        index = self._indexes.get(currency.code)
+        if index is None:
+            index = self._indexes[currency.code] = len(self.currencies)
+            self.currencies.append(currency)
+        return index
+
+    def encode(self, chunk):
+        """
+        Returns the records of ``chunk`` packed in a string, or as a list of
+        (currency index, exponent, units) tuples when they do not fit.
+        """
+        records = [(self.index(money.currency),) + _units(money)[::-1] for money in chunk]
+        buffer = bytearray(_RECORD.size * len(records))
+        pack_into = _RECORD.pack_into
+        try:
+            for i, record in enumerate(records):
+                pack_into(buffer, i * _RECORD.size, *record)
+        except struct.error:
+            return records
+        return str(buffer)
+
+    def encode_amounts(self, chunk):
+        """
+        Returns (currency index, amount as text) pairs for ``chunk``.
+        """
+        return [(self.index(money.currency), str(money.amount)) for money in chunk]
+
+def _records(payload):
+    if not isinstance(payload, str):
+        return payload
+    unpack_from = _RECORD.unpack_from
+    return [unpack_from(payload, offset) for offset in xrange(0, len(payload), _RECORD.size)]
+
+def _chunks(moneys, chunk_size):
+    iterator = iter(moneys)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _map(function, arguments, processes, pool, ordered=True):
+    """
+    Maps ``function`` over ``arguments`` in ``pool``, in a new pool of
+    ``processes`` workers, or in this process when ``processes`` is 0.
+    """
+    if pool is None and processes == 0:
+        for result in imap(function, arguments):
+            yield result
+        return
+    own_pool = pool is None
+    if own_pool:
+        pool = multiprocessing.Pool(processes)
+    try:
+        if ordered:
+            results = pool.imap(function, arguments)
+        else:
+            results = pool.imap_unordered(function, arguments)
+        for result in results:
+            yield result
+    finally:
+        if own_pool:
+            pool.terminate()
+            pool.join()
+
+def _add(totals, index, units, exponent):
+    total = totals.get(index)
+    if total is None:
+        totals[index] = (units, exponent)
+        return
+    total_units, total_exponent = total
+    if exponent > total_exponent:
+        total_units *= 10 ** (exponent - total_exponent)
+        total_exponent = exponent
+    elif exponent < total_exponent:
+        units *= 10 ** (total_exponent - exponent)
+    totals[index] = (total_units + units, total_exponent)
+
+def _sum_chunk(payload):
+    totals = {}
+    for index, exponent, units in _records(payload):
+        _add(totals, index, units, exponent)
+    return totals
+
+def parallel_sum(moneys, chunk_size=CHUNK_SIZE, processes=None, pool=None):
+    """
+    Adds up an iterable of Money in any currencies, returning a MoneyBag of
+    the total per currency.  Totals are exact integers until the end, where
+    each is turned into one Decimal.
+    """
+    encoder = _Encoder()
+    payloads = imap(encoder.encode, _chunks(moneys, chunk_size))
+    totals = {}
+    for partial in _map(_sum_chunk, payloads, processes, pool, ordered=False):
+        for index, (units, exponent) in partial.iteritems():
+            _add(totals, index, units, exponent)
+    bag = MoneyBag()
+    for index, (units, exponent) in totals.iteritems():
+        bag.add(Money(Decimal('%dE%d' % (units, -exponent)), encoder.currencies[index]))
+    return bag
+
+def _convert_chunk(arguments):
+    amounts, factors, precision, rounding = arguments
+    results = []
+    with localcontext() as context:
+        context.prec = precision
+        context.rounding = rounding
+        for index, amount in amounts:
+            divisor, multiplier = factors[index]
+            amount = Decimal(amount)
+            if divisor is not None:
+                amount = amount / divisor
+            results.append(amount * multiplier)
+    return results
+
+def parallel_convert(moneys, currency, chunk_size=CHUNK_SIZE, processes=None, pool=None):
+    """
+    Converts a sequence of Money to ``currency`` (a currency object, as for
+    Money.convert_to), returning a list in the same order.  Rates are taken
+    from the rate table once, in this process, and the arithmetic is
+    done by the workers with this thread's Decimal precision and rounding.
+    Values the rate table can not convert directly, and instances of Money
+    subclasses, are converted here with their own convert_to.
+
+    Amounts are sent as text rather than packed: the workers have to build
+    a Decimal from them either way, and on Python 2 str() of a Decimal is
+    the cheapest way to take one apart.
+    """
+    moneys = list(moneys)
+    table = rate_table()
+    encoder = _Encoder()
+    factors = {}
+    parallel = []
+    results = [None] * len(moneys)
+    for i, money in enumerate(moneys):
+        if type(money) is Money:
+            code = money.currency.code
+            if code not in factors:
+                factors[code] = table.factors(money.currency, currency)
+            if factors[code] is not None:
+                parallel.append(i)
+                continue
+        results[i] = money.convert_to(currency)
+    context = getcontext()
+    def arguments():
+        for chunk in _chunks(parallel, chunk_size):
+            payload = encoder.encode_amounts([moneys[i] for i in chunk])
+            indexed_factors = [factors[c.code] for c in encoder.currencies]
+            yield payload, indexed_factors, context.prec, context.rounding
+    converted = _map(_convert_chunk, arguments(), processes, pool)
+    chunks = _chunks(parallel, chunk_size)
+    for chunk, amounts in izip(chunks, converted):
+        for i, amount in zip(chunk, amounts):
+            results[i] = Money(amount, currency)
+    return results
+
+def _allocate_chunk(arguments):
+    payload, exponents, ratios, total = arguments
+    indexes = range(len(ratios))
+    results = []
+    for index, exponent, units in _records(payload):
+        if exponent < exponents[index]:
+            units *= 10 ** (exponents[index] - exponent)
+            exponent = exponents[index]
+        results.append((exponent, _allocate_units(units, ratios, total, indexes)))
+    return results
+
+def parallel_allocate(moneys, ratios, chunk_size=CHUNK_SIZE, processes=None, pool=None):
+    """
+    Allocates each of ``moneys`` across ``ratios`` like Money.allocate_many,
+    returning one list of parts per value.
+    """
+    moneys = list(moneys)
+    ratios, total = _integer_ratios(ratios)
+    encoder = _Encoder()
+    def arguments():
+        for chunk in _chunks(moneys, chunk_size):
+            payload = encoder.encode(chunk)
+            exponents = [currency.exponent for currency in encoder.currencies]
+            yield payload, exponents, ratios, total
+    results = []
+    for chunk, allocations in izip(_chunks(moneys, chunk_size),
+                                  _map(_allocate_chunk, arguments(), processes, pool)):
+        for money, (exponent, shares) in zip(chunk, allocations):
+            currency = money.currency
+            if isinstance(money, IntegerMoney):
+                results.append([_integer_money(share, exponent, currency) for share in shares])
+            else:
+                results.append([Money(Decimal(share).scaleb(-exponent), currency) for share in shares])
+    return results
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Parsing of monetary amounts from text, one value at a time or in bulk.
+"""
+import re
+from decimal import Decimal
+
+from money.Money import Money, IncorrectMoneyInputError, currency_provider
+from money.currencies import SYMBOLS
+
+__all__ = ('MoneyParser', 'parse_many', 'iter_parse')
+
+def _symbol_codes(symbols):
+    """
+    Maps symbols, both as unicode and as UTF-8 encoded str, to currency codes.
+    """
+    codes = {}
+    for code, symbol in symbols.iteritems():
+        codes.setdefault(symbol, code)
+    # symbols shared by several currencies
+    codes[u'$'] = 'USD'
+    codes[u'\xa5'] = 'JPY'
+    for symbol, code in codes.items():
+        codes[symbol.encode('utf-8')] = code
+    return codes
+
+_SYMBOL_CODES = _symbol_codes(SYMBOLS)
+
+class MoneyParser(object):
+    """
+    Parses strings such as "USD 10.00", "10.00 usd", "-$1,234.50" or
+    "EUR -5" in a single regular expression match.
+
+    The currency may come before or after the amount, as an ISO code (in
+    any case) or a symbol, and defaults to the default currency.  Amounts
+    may use ``grouping`` between groups of three digits; ``decimal_point``
+    separates the fraction, and an exponent such as ``1E+3`` may follow.
+    """
+
+    def __init__(self, decimal_point='.', grouping=',', symbols=None):
+        self.decimal_point = decimal_point
+        self.grouping = grouping
+        if symbols is None:
+            self.symbol_codes = _SYMBOL_CODES
+        else:
+            self.symbol_codes = _symbol_codes(symbols)
+        point = re.escape(decimal_point)
+        if grouping:
+            integer = r'\d{1,3}(?:%s\d{3})+|\d+' % re.escape(grouping)
+        else:
+            integer = r'\d+'
+        separators = re.escape(decimal_point + grouping)
+        self._pattern = re.compile(r'''
+            ^\s*(?P<sign>[-+]?)\s*
+            (?:(?P<prefix>[^\s\d+\-%(separators)s]+)\s*)?
+            (?P<inner_sign>[-+]?)\s*
+            (?P<number>(?:(?:%(integer)s)(?:%(point)s\d*)?|%(point)s\d+)(?:[eE][-+]?\d+)?)
+            \s*(?P<suffix>[^\s\d+\-%(separators)s]+)?\s*$
+            ''' % dict(separators=separators, integer=integer, point=point), re.VERBOSE | re.UNICODE)
+
+    def _split(self, s):
+        """
+        Returns the currency token (or None) and the amount of ``s`` as a
+        Decimal, or raises IncorrectMoneyInputError.
+        """
+        if not isinstance(s, basestring):
+            s = str(s)
+        match = self._pattern.match(s)
+        if match is None:
+            raise IncorrectMoneyInputError(s)
+        sign, prefix, inner_sign, number, suffix = match.groups()
+        if (sign and inner_sign) or (prefix and suffix):
+            raise IncorrectMoneyInputError(s)
+        if self.grouping:
+            number = number.replace(self.grouping, '')
+        if self.decimal_point != '.':
+            number = number.replace(self.decimal_point, '.')
+        amount = Decimal(number)
+        if sign == '-' or inner_sign == '-':
+            amount = -amount
+        return prefix or suffix, amount
+
+    def _lookup(self, token):
+        """
+        Resolves a currency code or symbol through the current provider.
+        """
+        provider = currency_provider()
+        if token is None:
+            return provider.get_default()
+        code = self.symbol_codes.get(token) or token.upper()
+        try:
+            return provider[code]
+        except KeyError:
+            raise IncorrectMoneyInputError(token)
+
+    def parse(self, s, money_class=Money):
+        """
+        Parses one string, raising IncorrectMoneyInputError if it is not a
+        monetary amount.
+        """
+        token, amount = self._split(s)
+        return money_class(amount, self._lookup(token))
+
+    def _iter_parse(self, lines, money_class):
+        currencies = {}
+        split = self._split
+        for line in lines:
+            try:
+                token, amount = split(line)
+                currency = currencies.get(token)
+                if currency is None:
+                    currency = currencies[token] = self._lookup(token)
+            except IncorrectMoneyInputError, e:
+                yield line, None, e
+            else:
+                yield line, money_class(amount, currency), None
+
+    def iter_parse(self, lines, money_class=Money):
+        """
+        Lazily parses an iterable of strings, such as a file object, yielding
+        a (money, error) pair for each one: the Money and None, or None and
+        the IncorrectMoneyInputError.  Currencies are looked up once per
+        distinct code or symbol.
+        """
+        for line, money, error in self._iter_parse(lines, money_class):
+            yield money, error
+
+    def parse_many(self, lines, money_class=Money):
+        """
+        Parses an iterable of strings.  Returns the list of results, with None
+        for the rows that failed, and a list of (index, line, error) for the
+        failures.
+        """
+        results = []
+        errors = []
+        for index, (line, money, error) in enumerate(self._iter_parse(lines, money_class)):
+            results.append(money)
+            if error is not None:
+                errors.append((index, line, error))
+        return results, errors
+
+DEFAULT_PARSER = MoneyParser()
+
+def iter_parse(lines, money_class=Money):
+    return DEFAULT_PARSER.iter_parse(lines, money_class)
+
+def parse_many(lines, money_class=Money):
+    return DEFAULT_PARSER.parse_many(lines, money_class)
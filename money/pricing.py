@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Pricing rules, compiled once and applied to many prices.
+
+A PricingPipeline runs an ordered list of rules over each price, working
+on the Decimal amount and building a single Money at the end rather than
+one per step:
+
+>>> pipeline = PricingPipeline([PercentOff(10), Tax(20), RoundToMinorUnit(), Floor(5)])
+>>> pipeline.apply(Money("19.99", "USD"))
+USD 21.59
+>>> pipeline.apply_many([Money(4, "EUR"), Money(1000, "JPY")])
+[EUR  5.00, JPY  1080]
+
+Compiling folds consecutive percentage rules into a single factor, and
+everything that depends on the currency (rounding quanta, fixed amounts,
+floors and caps) is worked out once per currency.
+"""
+from decimal import Decimal, ROUND_HALF_EVEN
+
+from money.Money import Money, _quantizer
+
+__all__ = ('PercentOff', 'FixedOff', 'Tax', 'RoundToMinorUnit', 'Floor', 'Cap',
+           'PricingPipeline')
+
+def _decimal(value):
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, float):
+        return Decimal(repr(value))
+    return Decimal(value)
+
+class Rule(object):
+    """
+    A step of a pricing pipeline.  ``factor`` is set by the rules that only
+    scale the amount, so that they can be folded together.
+    """
+    factor = None
+
+    def step(self, currency):
+        """
+        Returns a function of the amount for prices in ``currency``.
+        """
+        raise NotImplementedError
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(map(repr, self.args)))
+
+class _Scale(Rule):
+    def __init__(self, factor):
+        self.args = (factor,)
+        self.factor = factor
+
+    def step(self, currency):
+        factor = self.factor
+        return lambda price: price * factor
+
+class PercentOff(_Scale):
+    """
+    Takes ``percent`` percent off the price.
+    """
+
+    def __init__(self, percent):
+        self.args = (percent,)
+        self.factor = (100 - _decimal(percent)) / 100
+
+class Tax(_Scale):
+    """
+    Adds ``percent`` percent to the price.
+    """
+
+    def __init__(self, percent):
+        self.args = (percent,)
+        self.factor = (100 + _decimal(percent)) / 100
+
+class _AmountRule(Rule):
+    """
+    A rule with an amount, given either as a number, in the currency of
+    each price, or as a Money, which only prices in its currency may meet.
+    """
+
+    def __init__(self, amount):
+        self.args = (amount,)
+        self.amount = amount
+
+    def amount_in(self, currency):
+        if isinstance(self.amount, Money):
+            if self.amount.currency != currency:
+                raise TypeError, '%r does not apply to prices in %s' % (self, currency)
+            return self.amount.amount
+        return _decimal(self.amount)
+
+class FixedOff(_AmountRule):
+    """
+    Takes a fixed amount off the price.
+    """
+
+    def step(self, currency):
+        amount = self.amount_in(currency)
+        return lambda price: price - amount
+
+class Floor(_AmountRule):
+    """
+    Raises prices below ``amount`` to ``amount``.
+    """
+
+    def step(self, currency):
+        amount = self.amount_in(currency)
+        return lambda price: price if price >= amount else amount
+
+class Cap(_AmountRule):
+    """
+    Lowers prices above ``amount`` to ``amount``.
+    """
+
+    def step(self, currency):
+        amount = self.amount_in(currency)
+        return lambda price: price if price <= amount else amount
+
+class RoundToMinorUnit(Rule):
+    """
+    Rounds the price to the minor unit of its currency.
+    """
+
+    def __init__(self, rounding=ROUND_HALF_EVEN):
+        self.args = (rounding,)
+        self.rounding = rounding
+
+    def step(self, currency):
+        quantum, context = _quantizer(currency.exponent, self.rounding)
+        return lambda price: price.quantize(quantum, context=context)
+
+class PricingPipeline(object):
+    """
+    An ordered list of rules.  Runs of consecutive PercentOff and Tax rules
+    are multiplied into one factor when the pipeline is made, and the steps
+    for a currency are built the first time a price in it comes along.
+    """
+
+    def __init__(self, rules, money_class=Money):
+        self.rules = list(rules)
+        self.money_class = money_class
+        self._compiled = self._fold(self.rules)
+        self._programs = {}
+
+    @staticmethod
+    def _fold(rules):
+        compiled = []
+        for rule in rules:
+            if rule.factor is not None and compiled and compiled[-1].factor is not None:
+                compiled[-1] = _Scale(compiled[-1].factor * rule.factor)
+            elif rule.factor is not None:
+                compiled.append(_Scale(rule.factor))
+            else:
+                compiled.append(rule)
+        return [rule for rule in compiled if rule.factor != 1]
+
+    def program(self, currency):
+        """
+        The steps for prices in ``currency``, as a tuple of functions of the
+        amount.
+        """
+        program = self._programs.get(currency.code)
+        if program is None or program[0] is not currency:
+            program = self._programs[currency.code] = \
+                (currency, tuple(rule.step(currency) for rule in self._compiled))
+        return program[1]
+
+    def apply(self, money):
+        """
+        Prices one Money.
+        """
+        amount = money.amount
+        for step in self.program(money.currency):
+            amount = step(amount)
+        return self.money_class(amount, money.currency)
+
+    def apply_many(self, moneys):
+        """
+        Prices an iterable of Money in one pass, returning a list.
+        """
+        money_class = self.money_class
+        programs = {}
+        results = []
+        for money in moneys:
+            currency = money.currency
+            program = programs.get(currency)
+            if program is None:
+                program = programs[currency] = self.program(currency)
+            amount = money.amount
+            for step in program:
+                amount = step(amount)
+            results.append(money_class(amount, currency))
+        return results
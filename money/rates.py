@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+Exchange rates over time.
+
+Rates follow the same convention as ``Currency.exchange_rate``: the price,
+in a currency, of one unit of the default currency.
+"""
+import csv
+import datetime
+from bisect import bisect_right
+from decimal import Decimal
+
+from money.Money import BaseCurrency, currency_provider, _resolve_currency
+
+__all__ = ('RateHistory', 'rate_history', 'set_rate_history')
+
+def _code(currency):
+    if isinstance(currency, BaseCurrency):
+        return currency.code
+    return str(currency).upper()
+
+def _day(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    return value
+
+class RateHistory(object):
+    """
+    An in-memory time series of exchange rates per currency.
+
+    For every currency the dates are kept sorted, with the rates in a
+    parallel list, so that the rate in effect on a date (the latest one
+    set on or before it) is found with a binary search.  The default
+    currency has a rate of 1 unless the history says otherwise.
+    """
+
+    def __init__(self, rows=()):
+        self._dates = {}
+        self._rates = {}
+        self.load(rows)
+
+    def add(self, currency, date, rate):
+        """
+        Records the rate of ``currency`` from ``date`` onwards.
+        """
+        code = _code(currency)
+        date = _day(date)
+        if not isinstance(rate, Decimal):
+            rate = Decimal(rate)
+        dates = self._dates.setdefault(code, [])
+        rates = self._rates.setdefault(code, [])
+        i = bisect_right(dates, date)
+        if i and dates[i - 1] == date:
+            rates[i - 1] = rate
+        else:
+            dates.insert(i, date)
+            rates.insert(i, rate)
+
+    def load(self, rows):
+        """
+        Bulk loads an iterable of (currency, date, rate) rows, sorting each
+        currency's series once rather than inserting row by row.  Later rows
+        win over earlier ones for the same currency and date.
+        """
+        series = {}
+        for currency, date, rate in rows:
+            if not isinstance(rate, Decimal):
+                rate = Decimal(rate)
+            series.setdefault(_code(currency), {})[_day(date)] = rate
+        for code, points in series.iteritems():
+            for date, rate in zip(self._dates.get(code, ()), self._rates.get(code, ())):
+                points.setdefault(date, rate)
+            dates = sorted(points)
+            self._dates[code] = dates
+            self._rates[code] = [points[date] for date in dates]
+
+    def load_csv(self, fileobj, date_format='%Y-%m-%d'):
+        """
+        Bulk loads rates from a CSV file of ``currency,date,rate`` rows.  A
+        header row starting with "currency" is skipped.
+        """
+        def rows():
+            strptime = datetime.datetime.strptime
+            for row in csv.reader(fileobj):
+                if not row or row[0].strip().lower() == 'currency':
+                    continue
+                code, date, rate = [field.strip() for field in row[:3]]
+                yield code, strptime(date, date_format).date(), rate
+        self.load(rows())
+
+    def rate_at(self, currency, date):
+        """
+        The rate of ``currency`` in effect on ``date``.  Raises KeyError if
+        there is none.
+        """
+        code = _code(currency)
+        dates = self._dates.get(code)
+        if dates:
+            i = bisect_right(dates, _day(date))
+            if i:
+                return self._rates[code][i - 1]
+        if code == _code(currency_provider().get_default()):
+            return Decimal(1)
+        raise KeyError, 'no exchange rate for %s on %s' % (code, date)
+
+    def cross_rate(self, source, target, date):
+        """
+        The rate to multiply amounts in ``source`` by to get ``target``, as
+        of ``date``.
+        """
+        return self.rate_at(target, date) / self.rate_at(source, date)
+
+    def convert(self, money, currency, date):
+        """
+        Converts ``money`` to ``currency`` at the rates in effect on ``date``.
+        """
+        if not isinstance(currency, BaseCurrency):
+            currency = _resolve_currency(currency)
+        return self._converted(money, currency, self.cross_rate(money.currency, currency, date))
+
+    def convert_many(self, moneys, dates, currency):
+        """
+        Converts a sequence of Money to ``currency``, each at the rates of
+        the matching entry of ``dates`` (or of ``dates`` itself when it is
+        a single date).  Values are grouped by date so that each cross rate
+        is looked up once per date.  Raises ValueError when there are not as
+        many dates as values.
+        """
+        if not isinstance(currency, BaseCurrency):
+            currency = _resolve_currency(currency)
+        moneys = list(moneys)
+        if isinstance(dates, datetime.date):
+            dates = [dates] * len(moneys)
+        else:
+            dates = list(dates)
+            if len(dates) != len(moneys):
+                raise ValueError, 'got %d dates for %d values' % (len(dates), len(moneys))
+        groups = {}
+        for i, date in enumerate(dates):
+            groups.setdefault(_day(date), []).append(i)
+        results = [None] * len(moneys)
+        for date, indexes in groups.iteritems():
+            cross_rates = {}
+            for i in indexes:
+                money = moneys[i]
+                code = money.currency.code
+                rate = cross_rates.get(code)
+                if rate is None:
+                    rate = cross_rates[code] = self.cross_rate(money.currency, currency, date)
+                results[i] = self._converted(money, currency, rate)
+        return results
+
+    def _converted(self, money, currency, rate):
+        converted = money.copy()
+        converted.currency = currency
+        converted.amount = money.amount * rate
+        return converted
+
+_RATE_HISTORY = RateHistory()
+
+def rate_history():
+    """
+    The RateHistory used by ``Money.convert_to(currency, at=date)``.
+    """
+    return _RATE_HISTORY
+
+def set_rate_history(history):
+    global _RATE_HISTORY
+    _RATE_HISTORY = history
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Exchange rates shared by the processes of a host through a memory-mapped
+file.
+
+One process publishes the rates of its currency provider (for instance a
+RateSnapshot of the Django Currency table) with publish(), and every worker
+reads them from the file with a SharedRateProvider, so that the rates are
+loaded once per host and all workers switch to new ones together.
+
+The file is big-endian and fixed-width.  A 20 byte header holds the magic
+``MRT1``, a generation number (unsigned long long) that goes up with every
+publication, the number of entries (unsigned int) and the code of the
+default currency.  It is followed by one 12 byte entry per currency with an
+exchange rate, sorted by code: the code, then the rate as an exponent
+(signed char) and an integer coefficient (signed long long), so that the
+rate is ``coefficient * 10**exponent``.
+
+publish() writes a new file next to the old one and renames it over it, so
+readers always see a complete file.  Readers keep the file they have mapped
+until a stat() shows that it was replaced, and only decode it again when
+its generation differs.
+
+With the Django currencies app, the publishing process passes a snapshot,
+``publish(path, RateSnapshot.load())``, whenever the rates change.  Each
+worker creates one provider when it starts, installs it, and refreshes it
+at the start of every request::
+
+    provider = SharedRateProvider(path)
+    money.set_currency_provider(provider)
+    ...
+    provider.refresh()
+
+Without ``currencies`` the provider copies the ISO table, since the app's
+provider, Currency.objects, can not be iterated without queries.
+
+>>> import os, tempfile
+>>> from money.currencies import CURRENCY
+>>> path = os.path.join(tempfile.mkdtemp(), 'rates')
+>>> CURRENCY['EUR'].exchange_rate = Decimal('0.8')
+>>> publish(path)
+1
+>>> RateFile(path).rates()
+{'EUR': Decimal('0.8')}
+>>> CURRENCY['EUR'].exchange_rate = None
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from decimal import Decimal, Context
+
+from money.Money import Currency, currency_provider, rates_changed
+from money.currencies import currency_table
+
+__all__ = ('publish', 'RateFile', 'SharedRateProvider', 'MAGIC')
+
+MAGIC = 'MRT1'
+
+_HEADER = struct.Struct('>4sQI3sx')
+_ENTRY = struct.Struct('>3sbq')
+
+# a signed long long holds any 18 digit coefficient
+_PRECISION = Context(prec=18)
+
+def _entry(code, rate):
+    sign, digits, exponent = _PRECISION.plus(rate).normalize().as_tuple()
+    coefficient = int(''.join(map(str, digits)))
+    if sign:
+        coefficient = -coefficient
+    try:
+        return _ENTRY.pack(str(code), exponent, coefficient)
+    except struct.error:
+        raise ValueError, 'can not store the rate %s of %s' % (rate, code)
+
+def _generation(path):
+    try:
+        with open(path, 'rb') as f:
+            magic, generation, count, default = _HEADER.unpack(f.read(_HEADER.size))
+    except (IOError, struct.error):
+        return 0
+    if magic != MAGIC:
+        return 0
+    return generation
+
+def publish(path, provider=None):
+    """
+    Writes the exchange rates of ``provider`` (the current currency provider
+    by default), which must be a dict of currencies such as CurrencySource
+    or RateSnapshot, to the file at ``path``, replacing it atomically.
+    Returns the generation of the new file.  Rates are stored with up to 18
+    significant digits.
+    """
+    if provider is None:
+        provider = currency_provider()
+    rates = sorted((currency.code, currency.exchange_rate)
+                   for currency in provider.itervalues() if currency.exchange_rate)
+    generation = _generation(path) + 1
+    header = _HEADER.pack(MAGIC, generation, len(rates), str(provider.get_default().code))
+    entries = ''.join(_entry(code, rate) for code, rate in rates)
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temporary = tempfile.mkstemp(dir=directory, prefix='.rates-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(entries)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temporary, 0644)
+        os.rename(temporary, path)
+    except:
+        os.unlink(temporary)
+        raise
+    return generation
+
+class RateFile(object):
+    """
+    A published rate file, mapped into memory.  refresh() maps the current
+    file if it was replaced since the last call.  rate() decodes a single
+    entry from the mapping into a new Decimal, and rates() decodes all of
+    them once per generation; either way the values are copies, not views
+    of the file.
+
+    The mapping and what was decoded from it are kept as one tuple, which
+    refresh() replaces and every reader takes once, so threads reading
+    while another refreshes keep using the mapping they started with.  A
+    replaced mapping is closed when the last reader lets go of it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._stat = None
+        # (generation, default code, mapping, offsets by code, decoded rates)
+        self._state = (0, None, None, {}, {})
+        self._lock = threading.Lock()
+        self.refresh()
+
+    @property
+    def generation(self):
+        return self._state[0]
+
+    @property
+    def default(self):
+        return self._state[1]
+
+    def refresh(self):
+        """
+        Returns True if a new generation of the file was mapped.
+        """
+        stat = os.stat(self.path)
+        key = (stat.st_ino, stat.st_mtime, stat.st_size)
+        if key == self._stat:
+            return False
+        with self._lock:
+            if key == self._stat:
+                return False
+            with open(self.path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                magic, generation, count, default = _HEADER.unpack_from(mapped)
+            except struct.error:
+                magic = None
+            if magic != MAGIC or len(mapped) != _HEADER.size + count * _ENTRY.size:
+                mapped.close()
+                raise ValueError, '%s is not a rate file' % self.path
+            self._stat = key
+            if generation == self.generation:
+                mapped.close()
+                return False
+            offsets = {}
+            for offset in xrange(_HEADER.size, len(mapped), _ENTRY.size):
+                offsets[mapped[offset:offset + 3]] = offset
+            self._state = (generation, default.rstrip('\0') or None, mapped, offsets, {})
+            return True
+
+    def _rate(self, mapped, offsets, code):
+        offset = offsets.get(code)
+        if offset is None:
+            return None
+        stored, exponent, coefficient = _ENTRY.unpack_from(mapped, offset)
+        if stored != code:
+            return None
+        return Decimal('%dE%d' % (coefficient, exponent))
+
+    def rate(self, code):
+        """
+        The exchange rate of ``code``, or None if the file has none.
+        """
+        generation, default, mapped, offsets, rates = self._state
+        return self._rate(mapped, offsets, code)
+
+    def rates(self):
+        """
+        Returns a dict of every code to its exchange rate.
+        """
+        generation, default, mapped, offsets, rates = self._state
+        if len(rates) != len(offsets):
+            rates.update((code, self._rate(mapped, offsets, code)) for code in offsets)
+        return rates
+
+class SharedRateProvider(object):
+    """
+    A currency provider with the currencies of ``currencies`` (the current
+    provider by default, or the ISO table when that is not a dict of
+    currencies) and the rates of the rate file at ``path``.  The
+    currencies are copies, so the rates of the original ones are left
+    alone.  Call refresh() wherever new rates should be picked up, such as
+    at the start of every request; it costs a stat() when the file has not
+    changed.
+
+    New rates come with a new set of copies, which replaces the old one in
+    a single assignment: a rate table or a lookup sees either the old rates
+    or the new ones, never a mix.  Currencies looked up before a refresh
+    keep their rates.
+    """
+    rates_by_code = True
+
+    def __init__(self, path, currencies=None):
+        if currencies is None:
+            currencies = currency_provider()
+            if not hasattr(currencies, 'itervalues'):
+                # such as Currency.objects, whose currencies are rows
+                currencies = currency_table()
+        self.file = RateFile(path)
+        self._default = currencies.get_default().code
+        self._rows = [(currency.code, currency.numeric, currency.name, currency.countries,
+                       currency.exponent) for currency in currencies.itervalues()]
+        self._update()
+
+    def _update(self):
+        rates = self.file.rates()
+        currencies = {}
+        for code, numeric, name, countries, exponent in self._rows:
+            currencies[code] = Currency(code, numeric, name, countries, exponent)
+        for code in rates:
+            if code not in currencies:
+                currencies[code] = Currency(code)
+        for code, currency in currencies.iteritems():
+            # set the slot rather than the property: rates_changed() is
+            # called once, after the swap
+            currency._exchange_rate = rates.get(code)
+        self._currencies = currencies
+        rates_changed()
+
+    def refresh(self):
+        """
+        Picks up the rates of a newly published file, returning True if
+        they changed.
+        """
+        if self.file.refresh():
+            self._update()
+            return True
+        return False
+
+    @property
+    def generation(self):
+        return self.file.generation
+
+    def get_default(self):
+        return self[self.file.default or self._default]
+
+    def __getitem__(self, code):
+        currencies = self._currencies
+        try:
+            return currencies[code]
+        except KeyError:
+            try:
+                return currencies[str(code).upper()]
+            except KeyError:
+                raise KeyError, 'currency "%s" was not found' % code
+
+    def get(self, code, default=None):
+        try:
+            return self[code]
+        except KeyError:
+            return default
+
+    def __contains__(self, code):
+        return code in self._currencies
+
+    def __iter__(self):
+        return iter(self._currencies)
+
+    def __len__(self):
+        return len(self._currencies)
+
+    def keys(self):
+        return self._currencies.keys()
+
+    def values(self):
+        return self._currencies.values()
+
+    def items(self):
+        return self._currencies.items()
+
+    def itervalues(self):
+        return self._currencies.itervalues()
+
+    def iteritems(self):
+        return self._currencies.iteritems()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+Sorting and ranking of Money, in one currency or across several.
+
+Money compares only with Money in the same currency, so a list of prices
+in several currencies can not be sorted as it is.  sort_key returns a key
+function that converts each value to a target currency, looking up each
+source currency's rate once, and sorted_money and nlargest_money use it:
+
+>>> from money import Money
+>>> prices = [Money(3, "USD"), Money("0.5", "USD"), Money(2, "USD")]
+>>> sorted_money(prices)
+[USD  0.50, USD  2.00, USD  3.00]
+>>> nlargest_money(prices, 2, "USD")
+[USD  3.00, USD  2.00]
+
+sorted_money computes the keys once and then sorts plain integers, which
+is several times faster than sorting by Decimal keys, let alone comparing
+Money with Money.
+"""
+import heapq
+
+from money.Money import rate_table, _resolve_currency
+from money.codec import _decimal_units
+
+__all__ = ('sort_key', 'sorted_money', 'nlargest_money')
+
+def sort_key(currency=None):
+    """
+    Returns a function giving the amount of a Money converted to
+    ``currency`` (a currency or code, the default currency when not given),
+    for use as the key of sorted(), min(), max() and the like.  Rates are
+    taken from the rate table when the key is made, and each source
+    currency's rate is looked up once; values the table can not convert are
+    converted with their own convert_to.
+    """
+    target = _resolve_currency(currency)
+    table = rate_table()
+    factors = {}
+    def key(money):
+        source = money.currency
+        if source is target:
+            return money.amount
+        code = source.code
+        if code not in factors:
+            factors[code] = table.factors(source, target)
+        if factors[code] is None:
+            return money.convert_to(target).amount
+        divisor, multiplier = factors[code]
+        if divisor is None:
+            return money.amount * multiplier
+        return money.amount / divisor * multiplier
+    return key
+
+def _integer_keys(amounts):
+    """
+    Returns the Decimal ``amounts`` as integers in a common unit, which keep
+    their order and compare much faster, or None if any of them is not
+    finite.
+    """
+    try:
+        units = map(_decimal_units, amounts)
+    except ValueError:
+        return None
+    exponent = max([0] + [places for value, places in units])
+    return [value * 10 ** (exponent - places) for value, places in units]
+
+def sorted_money(moneys, currency=None, reverse=False):
+    """
+    Returns a new list of ``moneys`` sorted by their value in ``currency``,
+    like sorted(moneys, key=sort_key(currency), reverse=reverse).  When all
+    the values are in one currency they are sorted by amount, without
+    converting them.  The sort is stable.
+    """
+    moneys = list(moneys)
+    codes = set(money.currency.code for money in moneys)
+    if len(codes) <= 1:
+        amounts = [money.amount for money in moneys]
+    else:
+        amounts = map(sort_key(currency), moneys)
+    keys = _integer_keys(amounts) or amounts
+    order = sorted(xrange(len(moneys)), key=keys.__getitem__, reverse=reverse)
+    return [moneys[i] for i in order]
+
+def nlargest_money(moneys, k, currency=None):
+    """
+    Returns the ``k`` largest of ``moneys`` by their value in ``currency``,
+    largest first.  Works on any iterable, holding only ``k`` values at once.
+    """
+    return heapq.nlargest(k, moneys, key=sort_key(currency))
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Lazy, composable stages for processing streams of Money.
+
+Every stage takes an iterable and returns an iterator (or, for the
+reductions, a result), consuming its input one value at a time.  None of
+them keeps more than a fixed amount of state: one running total per
+group, a window of ``size`` values, or the ``k`` largest values seen, so
+they work on unbounded streams such as files, querysets or queues.
+
+>>> moneys = [Money(5, "USD"), Money(3, "EUR"), Money(7, "USD"), Money(1, "USD")]
+>>> list(rolling(in_currency(moneys, "USD"), 2))
+[USD  5.00, USD 12.00, USD  8.00]
+>>> list(pipeline(moneys, lambda s: in_currency(s, "EUR"), rounded))
+[EUR  3.00]
+"""
+from collections import deque
+from decimal import Decimal, ROUND_HALF_EVEN
+
+from money.Money import Money, _resolve_currency
+from money.bag import MoneyBag
+from money.sorting import nlargest_money
+
+__all__ = ('in_currency', 'convert', 'rounded', 'running_totals', 'group_totals',
+           'rolling', 'top_k', 'pipeline')
+
+def in_currency(moneys, *currencies):
+    """
+    Yields the values in any of ``currencies`` (currencies or codes).
+    """
+    codes = frozenset(_resolve_currency(currency).code for currency in currencies)
+    for money in moneys:
+        if money.currency.code in codes:
+            yield money
+
+def convert(moneys, currency):
+    """
+    Yields each value converted to ``currency``, at the rates current when
+    it is converted.
+    """
+    currency = _resolve_currency(currency)
+    for money in moneys:
+        if money.currency is currency:
+            yield money
+        else:
+            yield money.convert_to(currency)
+
+def rounded(moneys, rounding=ROUND_HALF_EVEN):
+    """
+    Yields each value rounded to its currency's minor unit.
+    """
+    for money in moneys:
+        yield money.round(rounding)
+
+def _money_of(item):
+    return item
+
+def running_totals(items, key=None, value=None):
+    """
+    Yields (item, key, subtotal) for each item, where subtotal is the running
+    sum, as Money, of the values of the items so far with the same key and
+    currency.  ``key`` defaults to grouping everything together and
+    ``value`` extracts the Money of an item; by default the item is one.
+    Memory grows with the number of groups, not with the stream.
+    """
+    value = value or _money_of
+    totals = {}
+    for item in items:
+        money = value(item)
+        group = key and key(item)
+        subtotal_key = (group, money.currency.code)
+        subtotal = totals.get(subtotal_key)
+        if subtotal is None:
+            subtotal = money.amount
+        else:
+            subtotal += money.amount
+        totals[subtotal_key] = subtotal
+        yield item, group, Money(subtotal, money.currency)
+
+def group_totals(items, key, value=None):
+    """
+    Consumes ``items`` and returns a dict of key to a MoneyBag of the values
+    of the items with that key.  See running_totals for ``value``.
+    """
+    value = value or _money_of
+    groups = {}
+    for item in items:
+        group = key(item)
+        bag = groups.get(group)
+        if bag is None:
+            bag = groups[group] = MoneyBag()
+        bag.add(value(item))
+    return groups
+
+def rolling(moneys, size):
+    """
+    Yields the total of the last ``size`` values (fewer at the start) after
+    each value.  The total is kept up to date by adding the newest value and
+    subtracting the one leaving the window, so it equals the sum of the
+    values in the window as long as that fits the precision of the decimal
+    context.  All values must be in the same currency; values converted
+    by an earlier stage (see convert) were rounded by the conversion, and
+    are added up as they are.
+    """
+    if size < 1:
+        raise ValueError, 'window size must be at least 1'
+    window = deque()
+    total = Decimal(0)
+    currency = None
+    for money in moneys:
+        if currency is None:
+            currency = money.currency
+        elif money.currency != currency:
+            raise TypeError, 'can not add different currencies'
+        window.append(money.amount)
+        total += money.amount
+        if len(window) > size:
+            total -= window.popleft()
+        yield Money(total, currency)
+
+def top_k(moneys, k, currency=None):
+    """
+    Returns the ``k`` largest values, largest first, comparing them converted
+    to ``currency`` (the default currency when not given).  The values are
+    returned as they are, unconverted.  Only ``k`` values are held at once,
+    and each source currency's rate is looked up once.
+    """
+    return nlargest_money(moneys, k, currency)
+
+def pipeline(source, *stages):
+    """
+    Chains stages: each is called with the iterator returned by the one
+    before it, the first with ``source``.  Use lambdas or functools.partial
+    for stages that take more arguments.
+    """
+    for stage in stages:
+        source = stage(source)
+    return source
@@ -39,5 +39,8 @@ setup(name='python-money',
       zip_safe=False,
       install_requires=[
       ],
+      extras_require={
+          'arrays': ['numpy'],
+      },
       test_suite='tests.runtests.runtests',
       )
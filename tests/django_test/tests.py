@@ -1,6 +1,8 @@
 from unittest import TestCase
 from django_test.models import Entity, Entity_0_USD, Entity_USD
-from money import Money
+import pickle
+from decimal import Decimal
+from money import Money, FrozenMoney, IntegerMoney, MoneyBag
 from money.currencies import CURRENCY
 
 def pause(): raw_input("Press enter to continue")
@@ -195,3 +197,563 @@ class MoneyFieldTestCase(TestCase):
         self.assertEqual(e1.price, Money(100, "USD"))
         
         
+class MoneyTestCase(TestCase):
+
+    def test_pickle_shares_currency(self):
+        price = Money(10, "USD")
+        for protocol in (0, 1, 2):
+            restored = pickle.loads(pickle.dumps(price, protocol))
+            self.assertEqual(restored, price)
+            self.assertTrue(restored.currency is price.currency)
+
+    def test_unpickle_before_slots(self):
+        # Money("1500", "JPY") pickled by releases without __slots__
+        old = ['\x80\x02cmoney.Money\nMoney\nq\x00)\x81q\x01}q\x02(U\x08currencyq\x03cmoney.Money\n'
+               'Currency\nq\x04)\x81q\x05}q\x06(U\rexchange_rateq\x07NU\x04codeq\x08U\x03JPYq\tU\x04'
+               'nameq\nU\x03Yenq\x0bU\x07numericq\x0cU\x03392q\rU\tcountriesq\x0e]q\x0fU\x05JAPANq\x10'
+               'aubU\x06amountq\x11cdecimal\nDecimal\nq\x12U\x041500q\x13\x85q\x14Rq\x15U\x10'
+               'allow_conversionq\x16\x89ub.',
+               "ccopy_reg\n_reconstructor\np0\n(cmoney.Money\nMoney\np1\nc__builtin__\nobject\np2\n"
+               "Ntp3\nRp4\n(dp5\nS'currency'\np6\ng0\n(cmoney.Money\nCurrency\np7\ng2\nNtp8\nRp9\n"
+               "(dp10\nS'exchange_rate'\np11\nNsS'code'\np12\nS'JPY'\np13\nsS'name'\np14\nS'Yen'\n"
+               "p15\nsS'numeric'\np16\nS'392'\np17\nsS'countries'\np18\n(lp19\nS'JAPAN'\np20\nasbs"
+               "S'amount'\np21\ncdecimal\nDecimal\np22\n(S'1500'\np23\ntp24\nRp25\nsS'allow_conversion'"
+               "\np26\nI00\nsb."]
+        for data in old:
+            price = pickle.loads(data)
+            self.assertEqual(price, Money(1500, "JPY"))
+            self.assertTrue(price.currency is CURRENCY["JPY"])
+            self.assertFalse(price.allow_conversion)
+
+    def test_frozen(self):
+        price = FrozenMoney(10, "USD")
+        self.assertRaises(AttributeError, setattr, price, 'amount', 5)
+        self.assertEqual(price + 1, Money(11, "USD"))
+        self.assertEqual(len(set([price, FrozenMoney("10.00", "USD"), FrozenMoney(10, "EUR")])), 2)
+        self.assertEqual(hash(price), hash(10))
+
+    def test_frozen_conversions(self):
+        eur, usd = CURRENCY["EUR"], CURRENCY["USD"]
+        saved = eur.exchange_rate, usd.exchange_rate
+        try:
+            eur.exchange_rate, usd.exchange_rate = Decimal(2), Decimal(1)
+            price = FrozenMoney("1.50", "USD")
+            converted = price.convert_to(eur)
+            self.assertEqual(converted, Money(3, "EUR"))
+            self.assertTrue(price.convert_to(eur) is converted)
+            eur.exchange_rate = Decimal(3)
+            self.assertEqual(price.convert_to(eur), Money("4.5", "EUR"))
+            from money import Currency, CurrencyScope
+            from money.currencies import CurrencySource
+            class Rates(CurrencySource):
+                rates_by_code = True
+            tenant = Rates(EUR=Currency("EUR", "978"), USD=Currency("USD", "840"))
+            tenant.get_default = lambda: tenant["USD"]
+            tenant["EUR"].exchange_rate, tenant["USD"].exchange_rate = Decimal(5), Decimal(1)
+            with CurrencyScope(tenant):
+                self.assertEqual(price.convert_to(eur), Money("7.5", "EUR"))
+            self.assertEqual(price.convert_to(eur), Money("4.5", "EUR"))
+            # the memo does not keep the providers of earlier scopes alive
+            import gc, weakref
+            kept = []
+            for i in range(50):
+                provider = Rates(EUR=Currency("EUR", "978"), USD=Currency("USD", "840"))
+                provider.get_default = lambda: CURRENCY["USD"]
+                provider["EUR"].exchange_rate = provider["USD"].exchange_rate = Decimal(1)
+                kept.append(weakref.ref(provider))
+                with CurrencyScope(provider):
+                    price.convert_to(eur)
+            del provider
+            gc.collect()
+            self.assertTrue(len([ref for ref in kept if ref() is not None]) <= 32)
+        finally:
+            eur.exchange_rate, usd.exchange_rate = saved
+
+    def test_integer_backend(self):
+        for a, b in (("10.00", "5.50"), ("-0.01", "1234.56")):
+            expected = Money(Decimal(a), "USD") + Money(Decimal(b), "USD")
+            result = IntegerMoney(Decimal(a), "USD") + IntegerMoney(Decimal(b), "USD")
+            self.assertEqual(str(result.amount), str(expected.amount))
+        self.assertTrue(IntegerMoney(1, "USD") < IntegerMoney("1.01", "USD"))
+        self.assertEqual(IntegerMoney(1, "USD") / 3, Money(1, "USD") / 3)
+        from money.Money import set_amount_backend
+        amounts = ("1", "10", "1.5", "0.125", "-3.10", "1E+3", "0.00")
+        decimal = [(Money(a, "USD"), Money(b, "USD")) for a in amounts for b in amounts]
+        set_amount_backend("integer")
+        try:
+            integer = [(Money(a, "USD"), Money(b, "USD")) for a in amounts for b in amounts]
+        finally:
+            set_amount_backend("decimal")
+        self.assertTrue(isinstance(integer[0][0], IntegerMoney))
+        for (a, b), (c, d) in zip(decimal, integer):
+            for result, expected in ((c, a), (c + d, a + b), (c - d, a - b), (c * 3, a * 3),
+                                     (c * Decimal("1.5"), a * Decimal("1.5")), (5 % c, 5 % a),
+                                     (Money.sum([c, d]), Money.sum([a, b]))):
+                self.assertEqual(str(result.amount), str(expected.amount))
+            self.assertEqual([str(part.amount) for part in c.allocate([1, 2])],
+                             [str(part.amount) for part in a.allocate([1, 2])])
+
+    def test_allocate(self):
+        parts = Money(10, "USD").allocate([1, 1, 1])
+        self.assertEqual(parts, [Money("3.34", "USD"), Money("3.33", "USD"), Money("3.33", "USD")])
+        self.assertEqual(Money("0.05", "USD").allocate([3, 7]), [Money("0.02", "USD"), Money("0.03", "USD")])
+        totals = [Money(-10, "USD"), Money("99.99", "USD")]
+        for total, parts in zip(totals, Money.allocate_many(totals, [2, 1, 1])):
+            self.assertEqual(sum(parts, Money(0, "USD")), total)
+
+    def test_sum(self):
+        moneys = [Money("1.10", "USD"), Money(2, "USD"), Money("0.05", "USD")]
+        self.assertEqual(Money.sum(moneys), sum(moneys, Money(0, "USD")))
+        self.assertEqual(Money.sum([], "EUR"), Money(0, "EUR"))
+        self.assertRaises(TypeError, Money.sum, [Money(1, "USD"), Money(1, "EUR")])
+        from money.Money import Currency
+        usd = Currency("USD", "840", "US Dollar")
+        self.assertFalse(usd != CURRENCY["USD"])
+        self.assertEqual(Money.sum([Money(1, "USD"), Money(2, usd)]), Money(3, "USD"))
+
+    def test_money_bag(self):
+        bag = MoneyBag([Money(10, "USD"), Money(5, "EUR"), Money(1, "USD")])
+        self.assertEqual(bag["USD"], Money(11, "USD"))
+        bag += MoneyBag([Money(2, "EUR")])
+        self.assertEqual(bag["EUR"], Money(7, "EUR"))
+        self.assertEqual(len(bag), 2)
+        self.assertEqual(MoneyBag([Money(3, "EUR")]).total("EUR"), Money(3, "EUR"))
+
+    def test_rate_table(self):
+        from money import rate_table
+        eur, gbp = CURRENCY["EUR"], CURRENCY["GBP"]
+        saved = eur.exchange_rate, gbp.exchange_rate
+        try:
+            eur.exchange_rate, gbp.exchange_rate = Decimal("0.5"), Decimal("2")
+            self.assertEqual(rate_table().factors(eur, gbp), (Decimal("0.5"), Decimal(2)))
+            self.assertEqual(Money(10, "EUR").convert_to(gbp), Money(40, "GBP"))
+            gbp.exchange_rate = Decimal("3")
+            self.assertEqual(Money(10, "EUR").convert_to(gbp), Money(60, "GBP"))
+            # the same two roundings as converting through the default currency
+            self.assertEqual(str(Money(2, "GBP").convert_to_default().amount), str(Decimal(2) / 3))
+            self.assertEqual(str(Money(2, "GBP").convert_to(eur).amount), str(Decimal(2) / 3 * Decimal("0.5")))
+        finally:
+            eur.exchange_rate, gbp.exchange_rate = saved
+
+    def test_rate_history(self):
+        import datetime
+        from StringIO import StringIO
+        from money import RateHistory
+        history = RateHistory()
+        history.load_csv(StringIO("currency,date,rate\nEUR,2010-01-01,0.5\nEUR,2010-02-01,0.25\n"))
+        history.add("GBP", datetime.date(2010, 1, 1), "2")
+        self.assertEqual(history.rate_at("EUR", datetime.date(2010, 1, 31)), Decimal("0.5"))
+        self.assertEqual(history.rate_at("EUR", datetime.date(2010, 2, 1)), Decimal("0.25"))
+        self.assertRaises(KeyError, history.rate_at, "EUR", datetime.date(2009, 12, 31))
+        converted = history.convert_many([Money(1, "EUR")] * 2,
+                                         [datetime.date(2010, 1, 5), datetime.date(2010, 2, 5)], "GBP")
+        self.assertEqual(converted, [Money(4, "GBP"), Money(8, "GBP")])
+        self.assertRaises(ValueError, history.convert_many, [Money(1, "EUR")] * 2,
+                          [datetime.date(2010, 1, 5)], "GBP")
+
+    def test_round(self):
+        self.assertEqual(Money("2.675", "USD").round(), Money("2.68", "USD"))
+        self.assertEqual(Money("2.5", "JPY").round(), Money(2, "JPY"))
+        self.assertEqual(Money("1.23456", "BHD").round().amount.as_tuple()[2], -3)
+        self.assertEqual(Money.round_many([Money("0.125", "EUR"), Money("7.7", "JPY")]),
+                         [Money("0.12", "EUR"), Money(8, "JPY")])
+        self.assertEqual(repr(Money(5, "JPY")), "JPY     5")
+
+    def test_parse_many(self):
+        from money.parsing import parse_many
+        self.assertEqual(Money.from_string("10.00 usd"), Money(10, "USD"))
+        self.assertEqual(Money.from_string("-$1,234.50"), Money("-1234.50", "USD"))
+        self.assertEqual(str(Money.from_string("USD 1E+3").amount), "1E+3")
+        self.assertEqual(Money.from_string("1e3 EUR"), Money(1000, "EUR"))
+        self.assertEqual(Money.from_string("10 eur"), Money(10, "EUR"))
+        moneys, errors = parse_many(["EUR 1", "oops", "2 EUR"])
+        self.assertEqual(moneys, [Money(1, "EUR"), None, Money(2, "EUR")])
+        self.assertEqual([(index, line) for index, line, error in errors], [(1, "oops")])
+
+    def test_format(self):
+        from money.formatting import format_money, format_many
+        self.assertEqual(format_money(Money("1234.5", "USD")), u"$1,234.50")
+        self.assertEqual(format_money(Money("-1234.5", "EUR"), "de_DE"), u"-1.234,50\xa0\u20ac")
+        self.assertEqual(format_money(Money(5, "USD"), pattern=u"#,##0.00 \xa4\xa4"), u"5.00 USD")
+        self.assertEqual(format_many(["1", "2.5"], currency="JPY"), [u"\xa51", u"\xa52"])
+
+    def test_currency_registry(self):
+        from money.currencies import CurrencySource
+        self.assertTrue(CURRENCY["usd"] is CURRENCY["USD"])
+        self.assertEqual(Money(1, "eur"), Money(1, "EUR"))
+        self.assertRaises(KeyError, CURRENCY.__getitem__, "zzz")
+        self.assertTrue(CURRENCY.by_numeric("840") is CURRENCY.by_numeric(840) is CURRENCY["USD"])
+        self.assertTrue(CURRENCY["JPY"] in CURRENCY.by_country("Japan"))
+        registry = CurrencySource(USD=CURRENCY["USD"])
+        self.assertEqual(registry.by_country("japan"), ())
+        registry["JPY"] = CURRENCY["JPY"]
+        self.assertEqual(registry.by_country("japan"), (CURRENCY["JPY"],))
+
+    def test_currency_table(self):
+        from money.currencies import ISO_4217
+        self.assertEqual(len(CURRENCY), len(ISO_4217))
+        self.assertEqual(CURRENCY["jpy"].exponent, 0)
+        # copies made by the interpreter itself see every currency
+        self.assertEqual(dict(CURRENCY), dict(CURRENCY.items()))
+        copy = {}
+        copy.update(CURRENCY)
+        self.assertTrue(copy["USD"] is CURRENCY["USD"])
+        from money import currency_provider
+        self.assertTrue(currency_provider() is CURRENCY)
+
+    def test_currency_table_lazy(self):
+        import subprocess, sys
+        script = "\n".join([
+            "import sys, threading, money",
+            "module = sys.modules['money.currencies']",
+            "print module._module._TABLE is None",
+            "tables = []",
+            "threads = [threading.Thread(target=lambda: tables.append(money.currency_provider()))",
+            "           for i in range(8)]",
+            "for thread in threads: thread.start()",
+            "for thread in threads: thread.join()",
+            "print len(set(map(id, tables))) == 1 and tables[0] is module.CURRENCY",
+            "print len(dict(module.CURRENCY))"])
+        output = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE).communicate()[0]
+        self.assertEqual(output.split(), ["True", "True", str(len(CURRENCY))])
+
+    def test_currency_scope(self):
+        import threading
+        from money import CurrencyScope, currency_provider
+        from money.currencies import CurrencySource
+        tenant = CurrencySource(EUR=CURRENCY["EUR"], USD=CURRENCY["USD"])
+        tenant.get_default = lambda: CURRENCY["EUR"]
+        with CurrencyScope(tenant):
+            self.assertEqual(Money(1), Money(1, "EUR"))
+            self.assertRaises(KeyError, Money, 1, "GBP")
+            codes = []
+            thread = threading.Thread(target=lambda: codes.append(Money(1).currency.code))
+            thread.start()
+            thread.join()
+            self.assertEqual(codes, ["XXX"])
+        self.assertTrue(currency_provider() is CURRENCY)
+        self.assertEqual(CurrencyScope(tenant)(lambda: Money(2))(), Money(2, "EUR"))
+
+    def test_codec(self):
+        from money.codec import dumps, loads, dumps_many, loads_many
+        values = [Money("12.50", "EUR"), Money("-0.001", "BHD"), Money(7, "JPY")]
+        for value in values:
+            self.assertEqual(str(loads(dumps(value)).amount), str(value.amount))
+        data = dumps_many(values)
+        self.assertEqual(len(data), 4 + 11 * len(values))
+        self.assertEqual(loads_many(memoryview(data)), values)
+        self.assertEqual(loads_many(str(data), IntegerMoney), values)
+        self.assertRaises(ValueError, dumps, Money(Decimal("NaN"), "USD"))
+        converting = pickle.loads(pickle.dumps(Money(1, "USD", allow_conversion=True)))
+        self.assertTrue(converting.allow_conversion)
+        self.assertTrue(len(pickle.dumps(values[0], 2)) < 100)
+
+        from money import BaseCurrency, CurrencyScope
+        class Row(BaseCurrency):
+            def __init__(self, code):
+                self.code = code
+        rows = {"EUR": Row("EUR")}
+        class Manager(object):
+            # like Currency.objects: its own currency objects, and values()
+            # is a query
+            def __getitem__(self, code):
+                return rows[code]
+            def get_default(self):
+                return rows["EUR"]
+            def values(self):
+                raise AssertionError("values() was called")
+        # written with the ISO table, read with another provider
+        data = pickle.dumps(values[0], 2), dumps(values[0])
+        with CurrencyScope(Manager()):
+            for restored in pickle.loads(data[0]), loads(data[1]):
+                self.assertTrue(restored.currency is rows["EUR"])
+                self.assertEqual(str(restored.amount), "12.50")
+        with CurrencyScope(CURRENCY.copy()):
+            self.assertTrue(pickle.loads(data[0]).currency is CURRENCY["EUR"])
+
+    def test_json(self):
+        from StringIO import StringIO
+        from money import json
+        values = [Money("12.50", "EUR"), Money("-0.001", "BHD"), Money(7, "JPY")]
+        self.assertEqual(json.loads(json.dumps({"total": values[0]})), {"total": values[0]})
+        text = "".join(json.iterencode_many(values, chunk_size=2))
+        self.assertEqual(json.loads(text), values)
+        self.assertEqual(list(json.iter_decode(StringIO(text), chunk_size=5)), values)
+        self.assertEqual(list(json.iter_decode(["[1", "2, {\"a\": 1}]"])), [12, {"a": 1}])
+        self.assertRaises(ValueError, list, json.iter_decode(["[1, 2"]))
+
+        from money import CurrencyScope
+        from money.currencies import CurrencySource
+        from money import Currency
+        euro = Currency("EUR", "978", "Euro")
+        with CurrencyScope(CurrencySource(EUR=euro)):
+            self.assertTrue(json.object_hook.currency("EUR") is euro)
+        self.assertTrue(json.object_hook.currency("EUR") is CURRENCY["EUR"])
+
+    def test_instrumentation(self):
+        from money import instrumentation, currency_provider
+        init = Money.__init__
+        events = []
+        instrumentation.reset()
+        hook = lambda event, elapsed: events.append(event)
+        instrumentation.add_hook(hook)
+        instrumentation.enable()
+        try:
+            Money(1, "usd")
+            Money(10, "USD").allocate([1, 1])
+            self.assertRaises(Exception, Money.from_string, "oops")
+            # a scope per request must not keep every provider alive
+            import weakref
+            from money import CurrencyScope
+            from money.currencies import CurrencySource
+            kept = []
+            for i in range(100):
+                provider = CurrencySource(USD=CURRENCY["USD"])
+                kept.append(weakref.ref(provider))
+                with CurrencyScope(provider):
+                    Money(1, "USD")
+            del provider
+            self.assertTrue(len([ref for ref in kept if ref() is not None]) <= 32)
+        finally:
+            instrumentation.disable()
+            instrumentation.remove_hook(hook)
+        counts = dict((event, value["count"]) for event, value in instrumentation.snapshot().items())
+        self.assertEqual((counts["parse_error"], counts["allocate"]), (1, 1))
+        self.assertTrue(counts["lookup"] >= 2 and counts["create"] >= 4)
+        self.assertEqual(len(events), sum(counts.values()))
+        self.assertTrue(Money.__dict__["__init__"] is init.__func__)
+        self.assertTrue(currency_provider() is CURRENCY)
+
+    def test_stream(self):
+        from itertools import count, imap, islice
+        from money import stream
+        moneys = [Money(5, "USD"), Money(3, "EUR"), Money(7, "USD"), Money("1.005", "USD")]
+        usd = list(stream.in_currency(moneys, "usd"))
+        self.assertEqual(len(usd), 3)
+        self.assertEqual(list(stream.rounded(usd))[-1], Money("1.00", "USD"))
+        self.assertEqual(list(stream.rolling(usd, 2))[-1], Money("8.005", "USD"))
+        totals = stream.group_totals(moneys, key=lambda money: money.amount > 4)
+        self.assertEqual(totals[True]["USD"], Money(12, "USD"))
+        self.assertEqual(list(stream.running_totals(moneys))[2][2], Money(12, "USD"))
+        self.assertEqual(stream.top_k(usd, 2, "USD"), [Money(7, "USD"), Money(5, "USD")])
+        endless = imap(lambda i: Money(i, "USD"), count())
+        self.assertEqual(list(islice(stream.rolling(endless, 3), 5))[-1], Money(9, "USD"))
+        from money import Currency
+        dollar = Currency("USD", "840", "US Dollar")
+        self.assertEqual(list(stream.rolling([Money(1, "USD"), Money(2, dollar)], 2))[-1], Money(3, "USD"))
+        eur, usd = CURRENCY["EUR"], CURRENCY["USD"]
+        saved = eur.exchange_rate, usd.exchange_rate
+        try:
+            eur.exchange_rate, usd.exchange_rate = Decimal(1) / 3, Decimal(1)
+            converted = list(stream.convert([Money(1, "USD"), Money(2, "EUR"), Money(1, "USD")], eur))
+            totals = list(stream.rolling(converted, 2))
+            # each converted value was rounded once, and the window sums them
+            self.assertEqual([str(total.amount) for total in totals],
+                             [str(sum(money.amount for money in converted[max(0, i - 1):i + 1]))
+                              for i in range(3)])
+            self.assertEqual(str(totals[1].amount), "2.333333333333333333333333333")
+        finally:
+            eur.exchange_rate, usd.exchange_rate = saved
+
+    def test_parallel(self):
+        from money.parallel import parallel_sum, parallel_convert, parallel_allocate
+        eur, usd = CURRENCY["EUR"], CURRENCY["USD"]
+        saved = eur.exchange_rate, usd.exchange_rate
+        try:
+            eur.exchange_rate, usd.exchange_rate = Decimal("0.83"), Decimal(1)
+            moneys = [Money(Decimal(i) / 7, "USD").round() for i in range(-50, 50)]
+            moneys += [Money("1.005", "EUR"), IntegerMoney(2, "USD"), Money(3, "JPY")]
+            for processes in (0, 2):
+                bag = parallel_sum(moneys, chunk_size=16, processes=processes)
+                self.assertEqual(bag, MoneyBag(moneys))
+                self.assertEqual(str(bag["USD"].amount), str(MoneyBag(moneys)["USD"].amount))
+                converted = parallel_convert(moneys[:-1], eur, chunk_size=16, processes=processes)
+                self.assertEqual([str(money.amount) for money in converted],
+                                 [str(money.convert_to(eur).amount) for money in moneys[:-1]])
+                self.assertEqual(parallel_allocate(moneys, [1, 2], chunk_size=16, processes=processes),
+                                 Money.allocate_many(moneys, [1, 2]))
+        finally:
+            eur.exchange_rate, usd.exchange_rate = saved
+
+    def test_pricing(self):
+        from money.pricing import PricingPipeline, PercentOff, FixedOff, Tax, RoundToMinorUnit, Floor, Cap
+        pipeline = PricingPipeline([PercentOff(10), Tax(20), FixedOff(1), RoundToMinorUnit(), Floor(5), Cap(900)])
+        def by_hand(money):
+            money = money - 10 % money
+            money = (money + 20 % money - 1).round()
+            return min(max(money, Money(5, money.currency)), Money(900, money.currency))
+        prices = [Money("19.99", "USD"), Money(4, "EUR"), Money(1000, "JPY"), Money("0.125", "BHD")]
+        self.assertEqual(pipeline.apply_many(prices), [by_hand(price) for price in prices])
+        self.assertEqual(pipeline.apply(prices[0]), by_hand(prices[0]))
+        self.assertRaises(TypeError, PricingPipeline([FixedOff(Money(1, "USD"))]).apply, prices[1])
+        from money import Currency
+        dollar = Currency("USD", "840", "US Dollar")
+        self.assertEqual(PricingPipeline([FixedOff(Money(1, dollar))]).apply(prices[0]), Money("18.99", "USD"))
+        # every rule can be used as a step on its own
+        for rule in (PercentOff(10), Tax(20), FixedOff(1), RoundToMinorUnit(), Floor(5), Cap(900)):
+            self.assertEqual(rule.step(prices[0].currency)(prices[0].amount),
+                             PricingPipeline([rule]).apply(prices[0]).amount)
+
+    def test_sorting(self):
+        from money import sort_key, sorted_money, nlargest_money
+        eur, usd = CURRENCY["EUR"], CURRENCY["USD"]
+        saved = eur.exchange_rate, usd.exchange_rate
+        try:
+            eur.exchange_rate, usd.exchange_rate = Decimal("0.5"), Decimal(1)
+            prices = [Money(3, "USD"), Money("1.25", "EUR"), Money(-1, "USD"), Money(1, "EUR"), Money(2, "USD")]
+            self.assertEqual(sorted_money(prices, "USD"), [prices[2], prices[3], prices[4], prices[1], prices[0]])
+            self.assertEqual(sorted_money(prices, "EUR", reverse=True), sorted(prices, key=sort_key(eur), reverse=True))
+            self.assertEqual(nlargest_money(iter(prices), 2, eur), [prices[0], prices[1]])
+            self.assertRaises(TypeError, sorted, prices)
+        finally:
+            eur.exchange_rate, usd.exchange_rate = saved
+        usd = [Money("1E+3", "USD"), Money("0.001", "USD"), Money(2, "USD"), Money("-0.5", "USD")]
+        self.assertEqual(sorted_money(usd), sorted(usd))
+        self.assertTrue(Money(1, "USD") <= Money(1, "USD") >= Money("0.5", "USD"))
+        self.assertRaises(TypeError, Money(1, "USD").__le__, Money(1, "EUR"))
+
+    def test_rate_snapshot(self):
+        from money import BaseCurrency, CurrencyScope, currency_provider, set_currency_provider
+        provider = currency_provider()
+        try:
+            # importing the app's models installs Currency.objects as provider
+            from money.contrib.django.currencies.models import RateSnapshot, Currency
+        finally:
+            set_currency_provider(provider)
+        class Row(BaseCurrency):
+            def __init__(self, code, exchange_rate, default=False):
+                self.code, self.numeric, self.name = code, "999", code
+                self.exchange_rate, self.default = exchange_rate, default
+        snapshot = RateSnapshot([Row("USD", Decimal(1), True), Row("EUR", Decimal("0.5"))])
+        self.assertEqual(snapshot["eur"].exchange_rate, Decimal("0.5"))
+        self.assertTrue(snapshot.get_default() is snapshot["USD"])
+        self.assertRaises(KeyError, snapshot.__getitem__, "GBP")
+        self.assertRaises(TypeError, snapshot.__setitem__, "GBP", Row("GBP", Decimal(1)))
+        self.assertRaises(TypeError, snapshot.update, {})
+        self.assertRaises(Currency.DoesNotExist, RateSnapshot([]).get_default)
+        class Database(object):
+            # stands in for Currency.objects: any lookup would be a query
+            def __getitem__(self, code):
+                raise AssertionError("queried %s" % code)
+            def get_default(self):
+                raise AssertionError("queried the default currency")
+        set_currency_provider(Database())
+        try:
+            with CurrencyScope(snapshot):
+                self.assertEqual(Money(3, "EUR").convert_to(snapshot["USD"]), Money(6, "USD"))
+                self.assertEqual(Money(3, "USD").convert_to(snapshot["EUR"]), Money("1.5", "EUR"))
+        finally:
+            set_currency_provider(provider)
+
+    def test_shared_rates(self):
+        import os, shutil, tempfile
+        from money import CurrencyScope
+        from money.sharedrates import publish, SharedRateProvider, RateFile
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "rates")
+        eur, usd, jpy = CURRENCY["EUR"], CURRENCY["USD"], CURRENCY["JPY"]
+        saved = eur.exchange_rate, usd.exchange_rate, jpy.exchange_rate
+        try:
+            eur.exchange_rate, usd.exchange_rate, jpy.exchange_rate = Decimal("0.8"), Decimal(2), Decimal(1) / 3
+            self.assertEqual(publish(path), 1)
+            provider = SharedRateProvider(path)
+            self.assertEqual(provider["JPY"].exchange_rate, Decimal("0.333333333333333333"))
+            eur.exchange_rate = Decimal("0.5")
+            self.assertEqual(publish(path), 2)
+            self.assertEqual(os.listdir(directory), ["rates"])
+            with CurrencyScope(provider):
+                self.assertEqual(Money(1, "EUR").convert_to(provider["USD"]), Money("2.5", "USD"))
+                before = provider["EUR"]
+                self.assertTrue(provider.refresh())
+                # the new rates come in new currencies, swapped in at once
+                self.assertEqual(before.exchange_rate, Decimal("0.8"))
+                self.assertFalse(provider["EUR"] is before)
+                self.assertFalse(provider.refresh())
+                self.assertEqual(provider.generation, 2)
+                self.assertEqual(Money(1, "EUR").convert_to(provider["USD"]), Money(4, "USD"))
+            self.assertEqual(provider["eur"].exchange_rate, Decimal("0.5"))
+            rates = RateFile(path)
+            generation, default, mapped, offsets, decoded = rates._state
+            self.assertEqual(publish(path), 3)
+            self.assertTrue(rates.refresh())
+            # a reader still holding the old mapping can use it
+            self.assertEqual(rates._rate(mapped, offsets, "EUR"), Decimal("0.5"))
+            self.assertEqual(rates.rate("XXX"), None)
+            class Manager(object):
+                def __getitem__(self, code):
+                    return CURRENCY[code]
+                def get_default(self):
+                    return CURRENCY.get_default()
+            with CurrencyScope(Manager()):
+                self.assertEqual(SharedRateProvider(path)["EUR"].exchange_rate, Decimal("0.5"))
+            open(path, "wb").write("junk")
+            self.assertRaises(ValueError, RateFile, path)
+        finally:
+            eur.exchange_rate, usd.exchange_rate, jpy.exchange_rate = saved
+            shutil.rmtree(directory)
+
+    def test_money_array(self):
+        try:
+            from money.arrays import MoneyArray
+        except ImportError:
+            self.skipTest("NumPy is not installed")
+        from decimal import ROUND_HALF_UP
+        amounts = ["3", "1.5", "0.25", "-2.125", "0", "0.00", "1000000", "0.005", "-0.004"]
+        moneys = [Money(amount, "USD") for amount in amounts]
+        others = moneys[::-1]
+        array, reversed_array = MoneyArray.from_moneys(moneys), MoneyArray.from_moneys(others)
+        self.assertNotEqual(array.exponent, None)
+        def same(array, moneys):
+            self.assertEqual([str(money.amount) for money in array.to_moneys()],
+                             [str(money.amount) for money in moneys])
+        same(array, moneys)
+        self.assertEqual(str(array[1].amount), "1.5")
+        same(array + reversed_array, [a + b for a, b in zip(moneys, others)])
+        same(array - reversed_array, [a - b for a, b in zip(moneys, others)])
+        for factor in (3, -2, Decimal("1.5"), Decimal("0.0")):
+            same(array * factor, [money * factor for money in moneys])
+            same(factor % array, [factor % money for money in moneys])
+        same(array / 3, [money / 3 for money in moneys])
+        same(array.quantize(Decimal("0.01"), ROUND_HALF_UP),
+             [money.quantize(Decimal("0.01"), ROUND_HALF_UP) for money in moneys])
+        self.assertEqual(list(array < reversed_array), [a < b for a, b in zip(moneys, others)])
+        self.assertEqual(list(array == reversed_array), [a == b for a, b in zip(moneys, others)])
+        self.assertEqual(str(array.sum().amount), str(Money.sum(moneys).amount))
+        eur, usd = CURRENCY["EUR"], CURRENCY["USD"]
+        saved = eur.exchange_rate, usd.exchange_rate
+        try:
+            eur.exchange_rate, usd.exchange_rate = Decimal("0.83"), Decimal(1)
+            same(array.convert_to(eur), [money.convert_to(eur) for money in moneys])
+        finally:
+            eur.exchange_rate, usd.exchange_rate = saved
+        mixed = [Money("1.25", "USD"), Money("0.005", "USD"), Money(7, "JPY"), Money(-1, "EUR")]
+        for part, expected in zip(MoneyArray.from_moneys(mixed).allocate([1, 1]),
+                                  zip(*Money.allocate_many(mixed, [1, 1]))):
+            same(part, expected)
+        # amounts an int64 array can not hold exactly are kept as Decimals
+        unusual = [Money("-0.00", "USD"), Money("1E+3", "USD")]
+        same(MoneyArray.from_moneys(unusual), unusual)
+
+    def test_currency_lookup(self):
+        from money import CurrencyScope
+        lookups = []
+        class Provider(dict):
+            def __getitem__(self, code):
+                lookups.append(code)
+                return dict.__getitem__(self, code)
+        provider = Provider(USD=CURRENCY["USD"])
+        with CurrencyScope(provider):
+            self.assertEqual(Money(1, "usd").currency, CURRENCY["USD"])
+            self.assertEqual(IntegerMoney(1, "usd").currency, CURRENCY["USD"])
+            del lookups[:]
+            self.assertRaises(KeyError, Money, 1, "XYZ")
+            self.assertEqual(lookups, ["XYZ"])
+            # everything else that takes a code looks it up the same way
+            from money.formatting import get_format
+            provider.get_default = lambda: CURRENCY["USD"]
+            zero = Money(0, CURRENCY["USD"])
+            del lookups[:]
+            self.assertEqual(Money.sum([], "usd"), zero)
+            self.assertEqual(MoneyBag().total("usd"), zero)
+            self.assertTrue(get_format("usd") is get_format(CURRENCY["USD"]))
+            self.assertEqual(lookups, ["usd", "USD"] * 3)